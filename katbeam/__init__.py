@@ -14,15 +14,51 @@
 # limitations under the License.
 ################################################################################
 
-from .jimbeam import JimBeam   # noqa: F401
+import sys as _sys
+
+__all__ = ['JimBeam', 'JimBeamArray', 'get_beam']
+
+# Public attributes and the submodules that provide them, imported on first access
+# so that importing katbeam does not pay for NumPy and the beam models up front
+_LAZY_ATTRIBUTES = {'JimBeam': 'jimbeam', 'JimBeamArray': 'jimbeam', 'get_beam': 'jimbeam'}
+
 
 # BEGIN VERSION CHECK
-# Get package version when locally imported from repo or via -e develop install
-try:
-    import katversion as _katversion
-except ImportError:
-    import time as _time
-    __version__ = "0.0+unknown.{}".format(_time.strftime('%Y%m%d%H%M'))
-else:
-    __version__ = _katversion.get_version(__path__[0])
+# Get package version when locally imported from repo or via -e develop install.
+# This may run git, so it is deferred until __version__ is first accessed.
+# Builds replace this block with a hard-coded version.
+def _get_version():
+    try:
+        import katversion as _katversion
+    except ImportError:
+        import time as _time
+        return "0.0+unknown.{}".format(_time.strftime('%Y%m%d%H%M'))
+    else:
+        return _katversion.get_version(__path__[0])
+
+
+if _sys.version_info < (3, 7):
+    __version__ = _get_version()
 # END VERSION CHECK
+
+
+def __getattr__(name):
+    if name == '__version__':
+        value = _get_version()
+    elif name in _LAZY_ATTRIBUTES:
+        import importlib
+        module = importlib.import_module('.' + _LAZY_ATTRIBUTES[name], __name__)
+        value = getattr(module, name)
+    else:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | {'__version__'})
+
+
+if _sys.version_info < (3, 7):
+    # Module-level __getattr__ is not supported (PEP 562), so import eagerly
+    from .jimbeam import JimBeam, JimBeamArray, get_beam   # noqa: F401
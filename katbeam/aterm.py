@@ -0,0 +1,152 @@
+################################################################################
+# Copyright (c) 2020, National Research Foundation (SARAO)
+#
+# Licensed under the BSD 3-Clause License (the "License"); you may not use
+# this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#   https://opensource.org/licenses/BSD-3-Clause
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+"""A-projection convolution kernels (A-terms) derived from the beam model."""
+
+import collections
+import hashlib
+import threading
+
+import numpy as np
+
+from .cache import _hash_array
+from .jimbeam import PRODUCTS
+
+
+def aterm_kernel(beam, freqMHz, pol='HH', support=16, oversample=8, fov=2.):
+    """Oversampled uv-domain convolution kernel of the beam at one frequency.
+
+    The beam is sampled on a `support` x `support` grid spanning the field of
+    view (via the separable grid path), zero-padded by the oversampling
+    factor and Fourier transformed, which yields a kernel with `support` uv
+    cells of width 1 / `fov` that are each sampled `oversample` times.
+
+    Parameters
+    ----------
+    beam : :class:`~katbeam.JimBeam` object
+        Beam model
+    freqMHz : float
+        Frequency, in MHz
+    pol : {'HH', 'VV', 'I', 'Q'}, optional
+        Beam product to transform (co-polarised voltage beams by default)
+    support : int, optional
+        Width of the kernel, in uv cells
+    oversample : int, optional
+        Number of kernel samples per uv cell
+    fov : float, optional
+        Width of the field of view (facet) covered by the kernel, in degrees
+
+    Returns
+    -------
+    kernel : array of complex, shape (support * oversample, support * oversample)
+        Kernel with axes (v, u), centred on sample ``support * oversample // 2``
+        and scaled so that its sum divided by ``oversample**2`` is the beam
+        at the field centre
+
+    Raises
+    ------
+    ValueError
+        If `pol` is an unknown product
+    """
+    if pol not in PRODUCTS:
+        raise ValueError('Unknown beam product {!r}, available ones are {!r}'
+                         .format(pol, list(PRODUCTS)))
+    axis = (np.arange(support) - support // 2) * (fov / support)
+    image = beam.products(axis[np.newaxis], axis[:, np.newaxis], freqMHz, which=(pol,))[0]
+    n = support * oversample
+    padded = np.zeros((n, n), np.result_type(beam.dtype, np.complex64))
+    start = n // 2 - support // 2
+    padded[start:start + support, start:start + support] = image
+    # Put the field centre at the origin, transform and centre the kernel
+    kernel = np.fft.fftshift(np.fft.fft2(np.fft.ifftshift(padded)))
+    kernel /= support * support
+    return kernel.astype(padded.dtype, copy=False)
+
+
+def _model_hash(beam):
+    """Hash of everything in `beam` that determines its kernels."""
+    digest = hashlib.sha256(repr((beam.taper, beam.dtype.str)).encode())
+    for array in (beam.freqMHzlist, beam.squintlist, beam.fwhmlist):
+        _hash_array(digest, array)
+    return digest.hexdigest()
+
+
+class KernelCache(object):
+    """Memory-bounded, thread-safe LRU cache of A-term kernels.
+
+    Kernels are keyed on the beam model (by content), product, frequency
+    bucket, support, oversampling and field of view, so that facets and
+    channels that share these reuse the same read-only kernel. Frequencies
+    are rounded to the centre of their bucket, where the kernel is evaluated.
+    The least recently used kernels are evicted when the cache grows beyond
+    `max_bytes`.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Maximum total size of cached kernels, in bytes
+    bucketMHz : float, optional
+        Width of frequency buckets sharing a kernel, in MHz
+    """
+
+    def __init__(self, max_bytes=256 * 1024**2, bucketMHz=1.):
+        self.max_bytes = max_bytes
+        self.bucketMHz = bucketMHz
+        self._kernels = collections.OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._kernels)
+
+    @property
+    def nbytes(self):
+        """Total size of cached kernels, in bytes."""
+        return self._nbytes
+
+    def kernel(self, beam, freqMHz, pol='HH', support=16, oversample=8, fov=2.):
+        """A-term kernel, either from the cache or evaluated and stored.
+
+        See :func:`aterm_kernel` for the parameters. The returned kernel is
+        read-only, as it is shared by all callers.
+        """
+        bucket = int(np.round(freqMHz / self.bucketMHz))
+        key = (_model_hash(beam), pol, bucket, support, oversample, float(fov))
+        with self._lock:
+            kernel = self._kernels.pop(key, None)
+            if kernel is not None:
+                # Mark the kernel as most recently used
+                self._kernels[key] = kernel
+                return kernel
+        # Evaluate outside the lock, so that other threads are not held up
+        kernel = aterm_kernel(beam, bucket * self.bucketMHz, pol, support, oversample, fov)
+        kernel.flags.writeable = False
+        with self._lock:
+            if key in self._kernels:
+                # Another thread got there first
+                return self._kernels[key]
+            self._kernels[key] = kernel
+            self._nbytes += kernel.nbytes
+            while self._nbytes > self.max_bytes and len(self._kernels) > 1:
+                _, evicted = self._kernels.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+        return kernel
+
+    def clear(self):
+        """Remove all cached kernels."""
+        with self._lock:
+            self._kernels.clear()
+            self._nbytes = 0
@@ -0,0 +1,168 @@
+################################################################################
+# Copyright (c) 2020, National Research Foundation (SARAO)
+#
+# Licensed under the BSD 3-Clause License (the "License"); you may not use
+# this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#   https://opensource.org/licenses/BSD-3-Clause
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+"""Persistent disk cache of evaluated beam cubes."""
+
+import glob
+import hashlib
+import os
+import uuid
+
+import numpy as np
+
+from .cube import header_path
+
+# Bump this if the cube contents change for the same inputs
+_CACHE_FORMAT = b'katbeam-cube-1'
+
+
+def _hash_array(digest, array):
+    array = np.ascontiguousarray(array)
+    digest.update(repr((array.dtype.str, array.shape)).encode())
+    digest.update(array.tobytes())
+
+
+class BeamCache(object):
+    """Content-addressed disk cache of beam cubes.
+
+    Cubes are stored as .npy files named after a hash of everything that
+    determines their contents: the beam model tables, taper backend and
+    dtype, the product, the frequencies and the grid. A cache hit is a
+    read-only memory map of the stored file. New cubes are written to a
+    temporary file and atomically renamed into place, so that several
+    processes can safely share a cache directory. The least recently used
+    cubes are evicted when the cache grows beyond `max_bytes`.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Cache directory, by default $KATBEAM_CACHE_DIR or ~/.cache/katbeam
+    max_bytes : int, optional
+        Maximum total size of cached cubes, in bytes
+    """
+
+    def __init__(self, directory=None, max_bytes=16 * 1024**3):
+        if directory is None:
+            directory = os.environ.get('KATBEAM_CACHE_DIR',
+                                       os.path.join(os.path.expanduser('~'), '.cache', 'katbeam'))
+        self.directory = directory
+        self.max_bytes = max_bytes
+        try:
+            os.makedirs(directory)
+        except OSError:
+            # Another process may have created it in the meantime
+            if not os.path.isdir(directory):
+                raise
+
+    def key(self, beam, freqMHz, grid, pol='I'):
+        """Hash identifying the beam cube of the given inputs."""
+        digest = hashlib.sha256(_CACHE_FORMAT)
+        digest.update(repr((beam.taper, beam.dtype.str, pol)).encode())
+        for array in (beam.freqMHzlist, beam.squintlist, beam.fwhmlist,
+                      np.asarray(freqMHz, dtype=float), grid[0], grid[1]):
+            _hash_array(digest, array)
+        return digest.hexdigest()
+
+    def cube(self, beam, freqMHz, grid, pol='I', workers=1):
+        """Beam cube, either loaded from the cache or evaluated and stored.
+
+        Parameters
+        ----------
+        beam : :class:`~katbeam.JimBeam` object
+            Beam model
+        freqMHz : 1-D array of float
+            Frequencies of cube channels, in MHz
+        grid : pair of arrays of float
+            Coordinates `x` and `y` where beam is sampled, in degrees,
+            broadcast against each other
+        pol : {'I', 'HH', 'VV', 'Q'}, optional
+            Beam product
+        workers : int, optional
+            Number of threads evaluating the cube on a cache miss
+
+        Returns
+        -------
+        cube : read-only :class:`numpy.memmap` of float, shape ``(nfreq,) + grid shape``
+            The beam cube
+        """
+        path = os.path.join(self.directory, self.key(beam, freqMHz, grid, pol) + '.npy')
+        try:
+            cube = np.load(path, mmap_mode='r')
+        except (IOError, OSError):
+            # Evaluate into a private file and publish it atomically (header first)
+            tmp_path = '{}.{}.tmp.npy'.format(path[:-4], uuid.uuid4().hex)
+            try:
+                # Discard the returned memory map so that the file is closed
+                beam.write_cube(tmp_path, freqMHz, grid, pols=(pol,), workers=workers)
+                # Map the file before publishing it, since other processes may evict it
+                # right away (the map stays valid after the rename and any removal)
+                cube = np.load(tmp_path, mmap_mode='r')
+                cube.filename = os.path.abspath(path)
+                os.replace(header_path(tmp_path), header_path(path))
+                os.replace(tmp_path, path)
+            finally:
+                for leftover in (tmp_path, header_path(tmp_path)):
+                    if os.path.exists(leftover):
+                        os.remove(leftover)
+            self._evict(keep=path)
+        else:
+            # Mark the cube as recently used
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+        return cube[0]
+
+    def _evict(self, keep=None):
+        """Remove least recently used cubes (and headers) until the cache fits in `max_bytes`."""
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, '*.npy')):
+            if path.endswith('.tmp.npy'):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            # Headers of dense grids hold full coordinate planes, so they count too
+            size = stat.st_size
+            try:
+                size += os.path.getsize(header_path(path))
+            except OSError:
+                pass
+            entries.append((stat.st_mtime, size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            # Open memory maps remain valid after their file is removed
+            for name in (path, header_path(path)):
+                try:
+                    os.remove(name)
+                except OSError:
+                    pass
+            total -= size
+
+    def clear(self):
+        """Remove all cached cubes."""
+        for path in glob.glob(os.path.join(self.directory, '*.npy')):
+            if not path.endswith('.tmp.npy'):
+                for name in (path, header_path(path)):
+                    try:
+                        os.remove(name)
+                    except OSError:
+                        pass
@@ -0,0 +1,125 @@
+################################################################################
+# Copyright (c) 2020, National Research Foundation (SARAO)
+#
+# Licensed under the BSD 3-Clause License (the "License"); you may not use
+# this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#   https://opensource.org/licenses/BSD-3-Clause
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+"""Primary beam attenuation of source catalogues."""
+
+import numpy as np
+
+from .jimbeam import PRODUCTS
+
+
+class SourceIndex(object):
+    """Spatial index of source positions, sorted along the first coordinate.
+
+    Sources inside a box are found with a binary search on `l` followed by a
+    scan of `m` over the matching strip only.
+
+    Parameters
+    ----------
+    l, m : arrays of float
+        Source coordinates, in degrees (flattened)
+    """
+
+    def __init__(self, l, m):  # noqa: E741
+        l, m = np.ravel(l), np.ravel(m)  # noqa: E741
+        if l.shape != m.shape:
+            raise ValueError('Source coordinates have different sizes ({} and {})'.format(l.size, m.size))
+        self.order = np.argsort(l, kind='mergesort')
+        self.l = l[self.order]  # noqa: E741
+        self.m = m[self.order]
+
+    def __len__(self):
+        return len(self.order)
+
+    def select(self, l_min, l_max, m_min, m_max):
+        """Positions in the sorted source arrays of the sources inside a box."""
+        start = np.searchsorted(self.l, l_min, side='left')
+        stop = np.searchsorted(self.l, l_max, side='right')
+        strip = self.m[start:stop]
+        return start + np.flatnonzero((strip >= m_min) & (strip <= m_max))
+
+
+def apparent_flux(beam, l, m, flux, freqs, cutoff, pol='I', chunk=65536, out=None):  # noqa: E741
+    """Attenuate the flux of catalogue sources by the primary beam.
+
+    The sources are indexed once, after which each channel only evaluates
+    the beam at the candidate sources inside the bounding box of the cutoff
+    ellipses of its feeds, in chunks of at most `chunk` sources. Sources
+    beyond the cutoff have zero apparent flux.
+
+    Parameters
+    ----------
+    beam : :class:`~katbeam.JimBeam` or :class:`~katbeam.JimBeamArray` object
+        Beam model (array beams add a leading antenna axis to the output)
+    l, m : 1-D arrays of float, length nsrc
+        Source coordinates relative to the pointing centre, in degrees
+    flux : array of float, shape (nsrc,) or (nfreq, nsrc)
+        Intrinsic source flux, optionally per channel
+    freqs : float or 1-D array of float
+        Channel frequencies, in MHz
+    cutoff : float
+        Normalised radius beyond which the beam is taken to be zero (see
+        :func:`katbeam.jimbeam.cutoff_radius`)
+    pol : {'I', 'HH', 'VV', 'Q'}, optional
+        Beam product applied to the flux
+    chunk : int, optional
+        Maximum number of sources evaluated at once
+    out : array of float, shape (nfreq, nsrc) or (nant, nfreq, nsrc), optional
+        Output array (e.g. a memory map), allocated if None
+
+    Returns
+    -------
+    apparent : array of float, shape ``np.shape(freqs) + (nsrc,)``
+        Apparent flux of each source per channel (and antenna, for array beams)
+
+    Raises
+    ------
+    ValueError
+        If `pol` is unknown or the inputs have mismatched shapes
+    """
+    if pol not in PRODUCTS:
+        raise ValueError('Unknown beam product {!r}, available ones are {!r}'
+                         .format(pol, list(PRODUCTS)))
+    index = SourceIndex(l, m)
+    freqs_1d = np.atleast_1d(np.asarray(freqs, dtype=float))
+    flux = np.broadcast_to(np.asarray(flux), (len(freqs_1d), len(index)))
+    # Antenna axes of array beams lead the output
+    model_shape = np.shape(beam.squintlist)[:-2]
+    shape = model_shape + flux.shape
+    if out is None:
+        out = np.zeros(shape, np.result_type(beam.dtype, flux))
+    elif out.shape != shape:
+        raise ValueError('Output array has shape {}, expected {}'.format(out.shape, shape))
+    else:
+        out[:] = 0
+    # Bounding boxes of the cutoff ellipses of the feeds (and antennas) involved, per channel
+    params = beam._interp_params(freqs_1d).reshape(8, -1, len(freqs_1d))
+    feeds = {'HH': slice(0, 1), 'VV': slice(1, 2)}.get(pol, slice(0, 2))
+    squint_x, squint_y = params[0:4:2][feeds], params[1:4:2][feeds]
+    reach_x, reach_y = cutoff * params[4:8:2][feeds], cutoff * params[5:8:2][feeds]
+    l_min, l_max = (squint_x - reach_x).min(axis=(0, 1)), (squint_x + reach_x).max(axis=(0, 1))
+    m_min, m_max = (squint_y - reach_y).min(axis=(0, 1)), (squint_y + reach_y).max(axis=(0, 1))
+    buffer = np.empty(model_shape + (min(chunk, len(index)),), beam.dtype)
+    for n, freq in enumerate(freqs_1d):
+        positions = index.select(l_min[n], l_max[n], m_min[n], m_max[n])
+        for start in range(0, len(positions), chunk):
+            chunk_positions = positions[start:start + chunk]
+            values = buffer[..., :len(chunk_positions)]
+            beam.products(index.l[chunk_positions], index.m[chunk_positions], freq,
+                          which=(pol,), out=[values], cutoff=cutoff)
+            sources = index.order[chunk_positions]
+            out[..., n, sources] = values * flux[n, sources]
+    return out if np.ndim(freqs) else out[..., 0, :]
@@ -0,0 +1,222 @@
+################################################################################
+# Copyright (c) 2020, National Research Foundation (SARAO)
+#
+# Licensed under the BSD 3-Clause License (the "License"); you may not use
+# this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#   https://opensource.org/licenses/BSD-3-Clause
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+"""Generation and storage of large beam cubes."""
+
+import os
+import sys
+import weakref
+
+import numpy as np
+
+from .jimbeam import (TILE_SIZE, JimBeam, get_beam, _check_single_beam, _flat_view, _products_kernel,
+                      _quadratic_pattern, _taper_function)
+
+# Ways of evaluating cubes in generate
+METHODS = ('direct', 'quadratic')
+
+# Beam, inputs and shared-memory cube of the current worker process
+_worker = {}
+
+
+def quadratic_products(beam, x, y, freqs, which, out):
+    """Evaluate beam products at fixed pixels for many channels via matrix products.
+
+    The squared normalised radius of every channel is a quadratic form in
+    the pixel coordinates, so it is found for all channels at once by
+    multiplying a (nfreq, 5) matrix of per-channel coefficients with the
+    (5, npix) pixel basis ``[x**2, x, y**2, y, 1]``, after which the taper is
+    applied. This turns most of the arithmetic into BLAS calls, which pays
+    off for cubes with many channels. Pixels are processed in blocks that
+    keep the basis and workspace small.
+
+    Parameters
+    ----------
+    beam : :class:`~katbeam.JimBeam` object
+        Beam model
+    x, y : arrays of float
+        Coordinates where beam is sampled, in degrees, broadcast against each other
+    freqs : 1-D array of float
+        Frequencies of cube channels, in MHz
+    which : sequence of str
+        Products to calculate, chosen from 'HH', 'VV', 'I' and 'Q'
+    out : sequence of arrays of float, shape ``(nfreq,) + grid shape``
+        Output arrays, one per product in `which`
+    """
+    grid_shape = np.broadcast(x, y).shape
+    npix = int(np.prod(grid_shape))
+    x = np.broadcast_to(x, grid_shape).reshape(npix)
+    y = np.broadcast_to(y, grid_shape).reshape(npix)
+    params = beam._interp_params(freqs)[:, :, np.newaxis]
+    outputs = dict((product, _flat_view(o, (len(freqs), npix))) for product, o in zip(which, out))
+    taper = _taper_function(beam.taper, beam.dtype)
+    step = max(TILE_SIZE // max(len(freqs), 1), 64)
+    basis = np.empty((5, min(step, npix)), beam.dtype)
+    scratch = np.empty((4, len(freqs), basis.shape[1]), beam.dtype)
+    basis[4] = 1.
+    for start in range(0, npix, step):
+        xb, yb = x[start:start + step], y[start:start + step]
+        n = len(xb)
+        np.multiply(xb, xb, out=basis[0, :n])
+        basis[1, :n] = xb
+        np.multiply(yb, yb, out=basis[2, :n])
+        basis[3, :n] = yb
+        tile_outputs = dict((product, o[:, start:start + n]) for product, o in outputs.items())
+        _products_kernel(basis[:, :n], None, params, tile_outputs, scratch[:, :, :n], taper,
+                         pattern=_quadratic_pattern)
+
+
+def _init_worker(beam, pols, freqs, x, y, name, shape, dtype, method):
+    from multiprocessing import shared_memory
+    # The pool shares the resource tracker of its parent, which owns the block
+    shm = shared_memory.SharedMemory(name=name)
+    _worker.update(beam=beam, pols=pols, freqs=freqs, x=x, y=y, shm=shm, method=method,
+                   cube=np.ndarray(shape, dtype, buffer=shm.buf))
+
+
+def _generate_block(start, stop):
+    cube = _worker['cube']
+    out = [cube[n, start:stop] for n in range(len(cube))]
+    _evaluate_block(_worker['beam'], _worker['x'], _worker['y'], _worker['freqs'][start:stop],
+                    _worker['pols'], out, _worker['method'])
+
+
+def _evaluate_block(beam, x, y, freqs, which, out, method):
+    if method == 'quadratic':
+        quadratic_products(beam, x, y, freqs, which, out)
+    else:
+        beam.products(x, y, freqs, which=which, out=out)
+
+
+def generate(model, pols, freqs, grid, processes=None, block=None, method='direct'):
+    """Generate a beam cube, distributing channel blocks over a process pool.
+
+    Each worker process receives a copy of the beam model and the grid once,
+    and writes its channel blocks straight into a shared-memory cube, so that
+    no results are pickled back to the parent process.
+
+    Parameters
+    ----------
+    model : :class:`~katbeam.JimBeam` object or str
+        Beam model, or the name of a known model
+    pols : str or sequence of str
+        Beam product(s) to generate, chosen from 'HH', 'VV', 'I' and 'Q'
+    freqs : 1-D array of float
+        Frequencies of cube channels, in MHz
+    grid : pair of arrays of float
+        Coordinates `x` and `y` where beam is sampled, in degrees. These are
+        broadcast against each other, which allows cheap regular grids like
+        those of ``np.meshgrid(xaxis, yaxis, sparse=True)``.
+    processes : int, optional
+        Number of worker processes (all CPUs by default). If 1, or on Python
+        versions before 3.8 (which lack shared memory), the cube is generated
+        in the calling process.
+    block : int, optional
+        Number of channels per task (by default about 4 tasks per process)
+    method : {'direct', 'quadratic'}, optional
+        Evaluate the beam directly per pixel (see :meth:`~katbeam.JimBeam.products`)
+        or as a matrix product over channels (see :func:`quadratic_products`),
+        which is faster for many channels on grids that are not separable
+
+    Returns
+    -------
+    cube : array of float, shape (npols, nfreqs) + grid shape
+        The beam cube, without the first axis if `pols` is a single string.
+        With several processes this is backed by the shared-memory block
+        itself, which is released once the cube (and all its views) are
+        garbage collected.
+
+    Raises
+    ------
+    ValueError
+        If `method` is unknown
+    TypeError
+        If `model` is a :class:`~katbeam.JimBeamArray`, as cubes hold single beams
+    """
+    if method not in METHODS:
+        raise ValueError('Unknown cube method {!r}, available ones are {!r}'.format(method, list(METHODS)))
+    beam = model if isinstance(model, JimBeam) else get_beam(model)
+    _check_single_beam(beam, 'generate')
+    which = (pols,) if isinstance(pols, str) else tuple(pols)
+    freqs = np.atleast_1d(np.asarray(freqs, dtype=float))
+    x, y = grid
+    shape = (len(which), len(freqs)) + np.broadcast(x, y).shape
+    processes = (os.cpu_count() or 1) if processes is None else processes
+    if sys.version_info < (3, 8):
+        # The worker processes need multiprocessing.shared_memory
+        processes = 1
+    if block is None:
+        block = max(-(-len(freqs) // (4 * processes)), 1)
+    if processes == 1:
+        cube = np.empty(shape, beam.dtype)
+        for start in range(0, len(freqs), block):
+            _evaluate_block(beam, x, y, freqs[start:start + block], which,
+                            [c[start:start + block] for c in cube], method)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import shared_memory
+        nbytes = int(np.prod(shape)) * beam.dtype.itemsize
+        shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        try:
+            initargs = (beam, which, freqs, x, y, shm.name, shape, beam.dtype, method)
+            with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=initargs) as executor:
+                starts = range(0, len(freqs), block)
+                futures = [executor.submit(_generate_block, start, start + block) for start in starts]
+                for future in futures:
+                    future.result()
+        except BaseException:
+            shm.close()
+            raise
+        finally:
+            # Remove the name right away, while the mapping stays valid until closed
+            shm.unlink()
+        # Hand out the shared block instead of a copy, which would double the peak memory.
+        # NumPy does not hold on to the buffer export, so the block is closed when the cube goes.
+        cube = np.ndarray(shape, beam.dtype, buffer=shm.buf)
+        weakref.finalize(cube, shm.close)
+    return cube[0] if isinstance(pols, str) else cube
+
+
+def header_path(path):
+    """Name of header file that accompanies the .npy cube file at `path`."""
+    root, ext = os.path.splitext(path)
+    return (root if ext == '.npy' else path) + '.hdr.npz'
+
+
+def read_cube(path, mode='r'):
+    """Open a beam cube written by :meth:`katbeam.JimBeam.write_cube`.
+
+    Parameters
+    ----------
+    path : str
+        Name of .npy cube file
+    mode : {'r', 'r+', 'c'}, optional
+        Memory-map mode of the cube (read-only by default)
+
+    Returns
+    -------
+    cube : :class:`numpy.memmap` of float, shape ``(npols, nfreq) + grid shape``
+        Memory map of the cube file
+    header : dict
+        Header with 'model' name, 'pols', 'freqMHz', grid coordinates 'x'
+        and 'y', and the 'dtype' and 'taper' of the beam evaluation
+    """
+    with np.load(header_path(path)) as npz:
+        header = dict((key, npz[key]) for key in npz.files)
+    for key in ('model', 'dtype', 'taper'):
+        header[key] = str(header[key])
+    header['pols'] = tuple(str(pol) for pol in header['pols'])
+    return np.load(path, mmap_mode=mode), header
@@ -14,7 +14,8 @@
 # limitations under the License.
 ################################################################################
 
-import io
+import itertools
+import threading
 
 import numpy as np
 
@@ -95,17 +96,474 @@ KNOWN_MODELS = {
         3450, 0.42, -0.03, -0.02, 0.29, 25.26, 29.09, 28.37, 25.94'''
 }
 
+# Beam products available from JimBeam.products
+PRODUCTS = ('HH', 'VV', 'I', 'Q')
+# Backends for evaluating the cosine taper (see _TaperTable for the table errors)
+TAPERS = ('exact', 'linear', 'cubic')
+# Maximum number of output samples per tile, which keeps scratch buffers cache-resident
+TILE_SIZE = 32768
+# Maximum size of a block of channels evaluated at once (e.g. streamed to disk by JimBeam.write_cube)
+_CUBE_BLOCK_BYTES = 64 * 1024 * 1024
+# Maximum number of scalar frequencies with memoised beam parameters per JimBeam
+_PARAM_CACHE_SIZE = 1024
+# Maximum size of a batch of pointing realisations evaluated by JimBeam.imaging_beam
+_SAMPLE_BLOCK_BYTES = 64 * 1024 * 1024
 
-def _cosine_taper(r):
-    # r is normalised such that the half power point occurs at r=0.5:
-    # _cosine_taper(0) = 1.0
-    # _cosine_taper(0.5) = sqrt(0.5)
-    rr = r * 1.1889647809329453#from scipy.optimize.newton(lambda rr: np.cos(np.pi * rr) / (1. - 4. * rr**2) - np.sqrt(0.5),1,tol=1e-15,maxiter=100)
-    return np.cos(np.pi * rr) / (1. - 4. * rr**2)
 
+def _taper_buffers(r2, out, scratch, nscratch):
+    """Allocate output and scratch buffers of taper functions if not provided."""
+    if out is None:
+        out = np.empty(np.shape(r2), np.result_type(r2, 1.))
+    if scratch is None:
+        scratch = np.empty((nscratch,) + out.shape, out.dtype)
+    return out, scratch
 
-def _pattern(x, y, squint_x, squint_y, fwhm_x, fwhm_y):
-    return _cosine_taper(np.sqrt(((x - squint_x) / fwhm_x)**2 + ((y - squint_y) / fwhm_y)**2))
+
+def _cosine_taper_r2(r2, out=None, scratch=None):
+    # Cosine taper cos(pi * rr) / (1 - 4 * rr**2) as a function of the square of the normalised
+    # radius r, where rr = 1.1889647809329453 * r puts the half power point at r = 0.5, i.e. the taper
+    # is 1 at r = 0 and sqrt(0.5) at r = 0.5 (the scale is the root of
+    # cos(pi * rr) / (1 - 4 * rr**2) - sqrt(0.5), found with scipy.optimize.newton).
+    # The result is written to `out` (which may be `r2` itself), using scratch[0] as workspace.
+    # With u = 0.5 - rr the taper becomes sin(pi * u) / (4 * u * (1 - u)), which avoids
+    # the catastrophic cancellation of cos(pi * rr) / (1 - 4 * rr**2) near rr = 0.5.
+    out, scratch = _taper_buffers(r2, out, scratch, 1)
+    rr = np.multiply(r2, 1.1889647809329453**2, out=out)
+    np.sqrt(rr, out=rr)
+    u = np.subtract(0.5, rr, out=scratch[0, ...])
+    denominator = np.subtract(1., u, out=out)
+    denominator *= u
+    denominator *= 4.
+    numerator = np.multiply(u, np.pi, out=u)
+    np.sin(numerator, out=numerator)
+    if not denominator.all():
+        # Removable singularity at rr = 0.5, where the taper tends to pi / 4
+        singular = denominator == 0
+        numerator[singular] = np.pi / 4.
+        denominator[singular] = 1.
+    return np.divide(numerator, denominator, out=out)
+
+
+class _TaperTable(object):
+    """Cosine taper tabulated on a uniform grid in squared normalised radius.
+
+    The taper is an analytic function of r**2, so interpolating a table in r**2
+    avoids both the sqrt and the cos per sample. The table stores polynomial
+    coefficients per interval, evaluated with Horner's scheme. Beyond `r2_max`
+    (four times the FWHM) the taper is evaluated exactly. The maximum absolute
+    errors over the table range are bounded by the interpolation remainder
+    terms and are checked densely in the test suite:
+
+    - 'linear': 1024 intervals per unit r**2, error below 2e-7
+    - 'cubic': 4-point Lagrange, 128 intervals per unit r**2, error below 1e-9
+    """
+
+    r2_max = 16.
+
+    def __init__(self, method, dtype=np.float64):
+        self.method = method
+        intervals_per_unit = 1024 if method == 'linear' else 128
+        self.step = 1. / intervals_per_unit
+        # Pad the samples on both sides so that every cubic stencil is available
+        n = int(self.r2_max * intervals_per_unit) + 4
+        rr2 = (np.arange(n) - 1.) * self.step * 1.1889647809329453**2
+        # Analytic continuation of cos(pi * sqrt(rr2)) for the pad sample at r2 < 0
+        numerator = np.where(rr2 < 0, np.cosh(np.pi * np.sqrt(np.abs(rr2))), np.cos(np.pi * np.sqrt(np.abs(rr2))))
+        denominator = 1. - 4. * rr2
+        singular = np.abs(denominator) < 1e-12
+        denominator[singular] = 1.
+        samples = numerator / denominator
+        # Removable singularity at rr = 0.5, where the taper tends to pi / 4
+        samples[singular] = np.pi / 4.
+        # Samples at the start of each interval and its neighbours
+        fm, f0, f1, f2 = samples[:-3], samples[1:-2], samples[2:-1], samples[3:]
+        if method == 'linear':
+            coefs = (f0, f1 - f0)
+        else:
+            coefs = (f0, -fm / 3. - f0 / 2. + f1 - f2 / 6.,
+                     fm / 2. - f0 + f1 / 2., -fm / 6. + f0 / 2. - f1 / 2. + f2 / 6.)
+        # Coefficients are computed in double precision and stored in the evaluation dtype
+        self.coefs = tuple(c.astype(dtype) for c in coefs)
+
+    def __call__(self, r2, out=None, scratch=None):
+        # Same interface as _cosine_taper_r2, but uses scratch[0] and scratch[1]
+        out, scratch = _taper_buffers(r2, out, scratch, 2)
+        t, coef = scratch[0, ...], scratch[1, ...]
+        np.multiply(r2, 1. / self.step, out=t)
+        # Clip first so that far-away (and NaN) samples do not overflow the index cast
+        np.fmin(t, self.r2_max / self.step, out=t)
+        index = t.astype(np.intp)
+        t -= index
+        # Save the far-away and NaN samples before `r2` is potentially overwritten
+        outside = np.logical_not(np.less(r2, self.r2_max))
+        far = np.asarray(r2)[outside] if outside.any() else None
+        np.take(self.coefs[-1], index, out=out)
+        for c in self.coefs[-2::-1]:
+            out *= t
+            out += np.take(c, index, out=coef)
+        if far is not None:
+            out[outside] = _cosine_taper_r2(far)
+        return out
+
+
+_TAPER_TABLES = {}
+
+
+def _taper_function(taper, dtype=np.float64):
+    """Function evaluating the cosine taper on r**2 for the given backend name and dtype."""
+    if taper == 'exact':
+        return _cosine_taper_r2
+    key = (taper, np.dtype(dtype).str)
+    try:
+        return _TAPER_TABLES[key]
+    except KeyError:
+        if taper not in TAPERS:
+            raise ValueError('Unknown taper backend {!r}, available ones are {!r}'
+                             .format(taper, list(TAPERS)))
+        return _TAPER_TABLES.setdefault(key, _TaperTable(taper, dtype))
+
+
+def _axis_term(c, squint, fwhm, out):
+    """Squared normalised offset ((c - squint) / fwhm)**2 along one axis.
+
+    This is written to `out` if the term spans its full shape, and otherwise
+    evaluated at its own, smaller shape (e.g. once per grid axis).
+    """
+    shape = np.broadcast(c, squint, fwhm).shape
+    term = np.subtract(c, squint, out=out if shape == out.shape else np.empty(shape, out.dtype))
+    term /= fwhm
+    term *= term
+    return term
+
+
+def _apply_taper(r2, scratch, taper, cutoff=None):
+    """Turn squared normalised radius `r2` into the beam in place.
+
+    If a `cutoff` radius is given, the taper is only evaluated inside it and
+    the beam is zero beyond it. Returns the mask of pixels inside the cutoff
+    (or None if there is no cutoff).
+    """
+    if cutoff is None:
+        taper(r2, out=r2, scratch=scratch)
+        return None
+    inside = r2 <= cutoff * cutoff
+    values = r2[inside]
+    taper(values, out=values, scratch=scratch.reshape(len(scratch), -1)[:, :len(values)])
+    r2.fill(0.)
+    r2[inside] = values
+    return inside
+
+
+def cutoff_radius(level):
+    """Normalised radius beyond which the co-polarised beam stays below `level`.
+
+    The radius is in units of FWHM (the half power point lies at 0.5), as
+    expected by the `cutoff` arguments of :class:`JimBeam`. For power beams
+    like Stokes I, pass the square root of the minimum power level.
+
+    Parameters
+    ----------
+    level : float
+        Minimum absolute voltage beam level of interest, between 0 and 1
+
+    Returns
+    -------
+    radius : float
+        Normalised cutoff radius
+
+    Raises
+    ------
+    ValueError
+        If `level` is not between 0 and 1
+    """
+    if not 0. < level < 1.:
+        raise ValueError('Beam level should be between 0 and 1, got {}'.format(level))
+    scale = 1.1889647809329453
+    # Beyond the half power point |cos(pi rr) / (1 - 4 rr**2)| <= 1 / (4 rr**2 - 1),
+    # which bounds all sidelobes below level from this radius onwards
+    rr = np.sqrt((1. / level + 1.) / 4.)
+    if rr <= 1.5:
+        # No sidelobe reaches the level, so find the edge of the (monotonic) main lobe
+        lower, upper = 0., rr
+        for _ in range(60):
+            middle = 0.5 * (lower + upper)
+            if _cosine_taper_r2(np.array((middle / scale) ** 2)) > level:
+                lower = middle
+            else:
+                upper = middle
+        rr = upper
+    return float(rr / scale)
+
+
+def _pattern(x, y, squint_x, squint_y, fwhm_x, fwhm_y, out, scratch, taper=_cosine_taper_r2, cutoff=None,
+             rotation=None, terms=None):
+    """Evaluate co-polarised beam into `out`, using scratch[0] and scratch[1] as workspace.
+
+    If `rotation` is given as the cosine and sine of the parallactic angle,
+    the beam is rotated on the sky by that angle (from x towards y). The
+    `terms` pair optionally holds precomputed x and y axis terms (or None).
+    Returns the mask of pixels inside the normalised `cutoff` radius, if given.
+    """
+    if rotation is None:
+        x2, y2 = terms if terms is not None else (None, None)
+        if x2 is None:
+            x2 = _axis_term(x, squint_x, fwhm_x, out)
+        if y2 is None:
+            y2 = _axis_term(y, squint_y, fwhm_y, scratch[0, ...])
+    else:
+        # Rotate sky coordinates back to the antenna frame, where the beam is defined
+        cos, sin = rotation
+        x2 = np.multiply(x, cos, out=out)
+        x2 += np.multiply(y, sin, out=scratch[0, ...])
+        x2 -= squint_x
+        x2 /= fwhm_x
+        x2 *= x2
+        y2 = np.multiply(y, cos, out=scratch[0, ...])
+        y2 -= np.multiply(x, sin, out=scratch[1, ...])
+        y2 -= squint_y
+        y2 /= fwhm_y
+        y2 *= y2
+    r2 = np.add(x2, y2, out=out)
+    return _apply_taper(r2, scratch, taper, cutoff)
+
+
+def _quadratic_pattern(basis, _, squint_x, squint_y, fwhm_x, fwhm_y, out, scratch, taper=_cosine_taper_r2,
+                       cutoff=None, rotation=None, terms=None):
+    """Evaluate co-polarised beam into `out` as a quadratic form in the pixel coordinates.
+
+    The squared normalised radius is a quadratic in x and y with coefficients
+    that only depend on the beam parameters, so given the pixel basis
+    ``[x**2, x, y**2, y, 1]`` of shape (5, npix) it becomes a single matrix
+    product of per-channel coefficients (shape (nchan, 5)) and the basis.
+    Parameters have shape (nchan, 1) and `out` has shape (nchan, npix).
+    """
+    if rotation is not None:
+        raise ValueError('The quadratic-form engine does not support rotated beams')
+    ax, ay = 1. / (fwhm_x * fwhm_x), 1. / (fwhm_y * fwhm_y)
+    coefs = np.hstack([ax, -2. * squint_x * ax, ay, -2. * squint_y * ay,
+                       squint_x * squint_x * ax + squint_y * squint_y * ay])
+    r2 = np.matmul(coefs, basis, out=out)
+    # Rounding errors near the beam centre may leave r2 slightly negative
+    np.maximum(r2, 0., out=r2)
+    return _apply_taper(r2, scratch, taper, cutoff)
+
+
+def _products_kernel(x, y, params, outputs, scratch, taper, pattern=_pattern, cutoff=None, fill=0.,
+                     terms=None):
+    """Evaluate beam products on a single tile.
+
+    Parameters
+    ----------
+    x, y : arrays of float
+        Coordinates of tile, broadcastable to tile shape
+    params : array of float, shape (8, ...) or (10, ...)
+        Squint and FWHM rows of :meth:`JimBeam._interp_params`, broadcastable to
+        tile shape, optionally followed by cosine and sine of parallactic angle
+    outputs : dict mapping str to array of float
+        Output buffers of tile, keyed by requested product
+    scratch : array of float, shape (4,) + tile shape
+        Workspace, where the last two rows hold H and V if they are not requested
+    taper : callable
+        Cosine taper function operating on squared normalised radius
+    pattern : callable, optional
+        Function evaluating co-polarised beams, e.g. :func:`_quadratic_pattern`,
+        which expects the pixel basis as `x`
+    cutoff : float, optional
+        Normalised radius beyond which the taper is skipped
+    fill : float, optional
+        Value of products beyond the cutoff of the feed(s) involved
+    terms : pair of pairs of arrays (or None), optional
+        Precomputed x and y axis terms of the H and V feeds (see :func:`_separable_terms`)
+    """
+    stokes = 'I' in outputs or 'Q' in outputs
+    work, H_work, V_work = scratch[:2], scratch[2, ...], scratch[3, ...]
+    H = outputs.get('HH', H_work) if stokes or 'HH' in outputs else None
+    V = outputs.get('VV', V_work) if stokes or 'VV' in outputs else None
+    H_inside = V_inside = None
+    rotation = params[8:] if len(params) > 8 else None
+    H_terms, V_terms = terms if terms is not None else (None, None)
+    if H is not None:
+        H_inside = pattern(x, y, params[0], params[1], params[4], params[5], H, work, taper, cutoff, rotation,
+                           H_terms)
+    if V is not None:
+        V_inside = pattern(x, y, params[2], params[3], params[6], params[7], V, work, taper, cutoff, rotation,
+                           V_terms)
+    if stokes:
+        # Square in place unless the co-polarised beams are also requested
+        H2 = np.multiply(H, H, out=H if H is H_work else work[0, ...])
+        V2 = np.multiply(V, V, out=V if V is V_work else work[1, ...])
+        if 'I' in outputs:
+            np.add(H2, V2, out=outputs['I'])
+            outputs['I'] *= 0.5
+        if 'Q' in outputs:
+            np.subtract(H2, V2, out=outputs['Q'])
+            outputs['Q'] *= 0.5
+    if cutoff is not None and fill != 0:
+        # Patterns are zero beyond the cutoff, so only other fill values need setting
+        for product, o in outputs.items():
+            inside = {'HH': H_inside, 'VV': V_inside}.get(product)
+            o[~(np.logical_or(H_inside, V_inside) if inside is None else inside)] = fill
+
+
+def _tile_steps(nprefix, shape):
+    """Tiling of output with shape (nprefix,) + shape.
+
+    Returns the number of prefix elements and rows per tile, and the number
+    of samples in the largest tile.
+    """
+    row_size = int(np.prod(shape[1:]))
+    plane_size = shape[0] * row_size
+    if nprefix * plane_size <= TILE_SIZE:
+        prefix_step, row_step = nprefix, shape[0]
+    elif plane_size <= TILE_SIZE:
+        prefix_step, row_step = TILE_SIZE // plane_size, shape[0]
+    else:
+        prefix_step, row_step = 1, max(TILE_SIZE // max(row_size, 1), 1)
+    tile_size = min(prefix_step, nprefix) * min(row_step, shape[0]) * row_size
+    return prefix_step, row_step, tile_size
+
+
+def _tiles(nprefix, nrows, prefix_step, row_step):
+    """Generate slices along the prefix and row axes of each tile."""
+    for p in range(0, nprefix, prefix_step):
+        for r in range(0, nrows, row_step):
+            yield slice(p, p + prefix_step), slice(r, r + row_step)
+
+
+def _finite_range(c):
+    """Minimum and maximum of the non-NaN values of `c`, or None if they are all NaN."""
+    low, high = c.min(), c.max()
+    if np.isnan(low) or np.isnan(high):
+        # Blanked coordinates must not hide the rest of the tile
+        finite = c[~np.isnan(c)]
+        if not finite.size:
+            return None
+        low, high = finite.min(), finite.max()
+    return low, high
+
+
+def _beyond_cutoff(x, y, params, cutoff):
+    """Check whether coordinates lie outside the cutoff ellipses of both feeds for all parameters."""
+    # Bounding boxes of the ellipses, with centres Hx,Vx (even rows) and Hy,Vy (odd rows)
+    centre_x, centre_y = params[0:4:2], params[1:4:2]
+    reach_x, reach_y = cutoff * params[4:8:2], cutoff * params[5:8:2]
+    if len(params) > 8:
+        # Rotate the centres onto the sky and bound the rotated ellipses by circles
+        cos, sin = params[8], params[9]
+        centre_x, centre_y = cos * centre_x - sin * centre_y, sin * centre_x + cos * centre_y
+        reach_x = reach_y = np.maximum(reach_x, reach_y)
+    x_range, y_range = _finite_range(x), _finite_range(y)
+    if x_range is None or y_range is None:
+        # Fully blanked tiles have no samples inside the cutoff
+        return True
+    (x_min, x_max), (y_min, y_max) = x_range, y_range
+    near_x = (centre_x + reach_x >= x_min) & (centre_x - reach_x <= x_max)
+    near_y = (centre_y + reach_y >= y_min) & (centre_y - reach_y <= y_max)
+    return not (near_x & near_y).any()
+
+
+def _separable_terms(x, y, params, separable, buffers):
+    """Axis terms of the H and V feeds along the coordinates flagged as `separable`.
+
+    Returns pairs of x and y terms per feed, which are evaluated into the
+    corresponding `buffers` (with None for coordinates that are not flagged).
+    """
+    terms = []
+    for k, feed_buffers in zip((0, 2), buffers):
+        feed_terms = []
+        for axis, (c, flag, buffer) in enumerate(zip((x, y), separable, feed_buffers)):
+            feed_terms.append(_axis_term(c, params[k + axis], params[k + axis + 4], buffer[:params.shape[1]])
+                              if flag else None)
+        terms.append(feed_terms)
+    return terms
+
+
+def _evaluate_tiles(tiles, x, y, params, outputs, scratch, taper, cutoff=None, fill=0.):
+    """Evaluate beam products on a sequence of tiles, reusing the `scratch` workspace."""
+    grid_shape = next(iter(outputs.values())).shape[1:]
+    # Axis terms of broadcast coordinates (e.g. the axes of a sparse meshgrid) are
+    # evaluated once per block of prefix elements and sliced by its tiles
+    separable = [len(params) == 8 and c.shape != grid_shape for c in (x, y)]
+    buffers = terms = current = None
+    for p_slice, r_slice in tiles:
+        tile_outputs = dict((product, o[p_slice, r_slice]) for product, o in outputs.items())
+        tile_shape = next(iter(tile_outputs.values())).shape
+        tile_scratch = scratch[:4 * int(np.prod(tile_shape))].reshape((4,) + tile_shape)
+        # Coordinates that are broadcast along the rows are shared by all tiles
+        tile_x = x[r_slice] if len(x) > 1 else x
+        tile_y = y[r_slice] if len(y) > 1 else y
+        tile_params = params[:, p_slice]
+        if cutoff is not None and _beyond_cutoff(tile_x, tile_y, tile_params, cutoff):
+            # Skip tiles that miss the main lobes entirely
+            for o in tile_outputs.values():
+                o.fill(fill)
+            continue
+        tile_terms = None
+        if any(separable):
+            if p_slice != current:
+                if buffers is None:
+                    step = p_slice.stop - p_slice.start
+                    buffers = [[np.empty((step,) + c.shape, params.dtype) for c in (x, y)] for _ in 'HV']
+                terms, current = _separable_terms(x, y, tile_params, separable, buffers), p_slice
+            tile_terms = [[None if t is None else t[:, r_slice] if t.shape[1] > 1 else t for t in feed_terms]
+                          for feed_terms in terms]
+        _products_kernel(tile_x, tile_y, tile_params, tile_outputs, tile_scratch, taper,
+                         cutoff=cutoff, fill=fill, terms=tile_terms)
+
+
+def _expand_dims(array, ndim):
+    """View of `array` with leading length-1 axes up to `ndim` dimensions."""
+    array = np.asarray(array)
+    return array.reshape((1,) * (ndim - array.ndim) + array.shape)
+
+
+def _grid_axes(xaxis, yaxis):
+    """Sparse meshgrid of 1-D axes, with x varying along columns and y along rows."""
+    xaxis, yaxis = np.asarray(xaxis), np.asarray(yaxis)
+    if xaxis.ndim != 1 or yaxis.ndim != 1:
+        raise ValueError('Grid axes should be 1-D, got shapes {} and {}'.format(xaxis.shape, yaxis.shape))
+    return xaxis[np.newaxis, :], yaxis[:, np.newaxis]
+
+
+def _check_single_beam(beam, method):
+    """Raise TypeError if `beam` is an array beam, which `method` does not support."""
+    if isinstance(beam, JimBeamArray):
+        raise TypeError('{} only supports single beams, not {}; evaluate array beams with '
+                        'products (or HH, VV and I) instead'.format(method, type(beam).__name__))
+
+
+def _flat_view(array, shape):
+    """Reshape `array` to `shape` without copying, or raise ValueError."""
+    flat = array.reshape(shape)
+    if array.size and not np.may_share_memory(flat, array):
+        raise ValueError('Output array with shape {} and strides {} cannot be reshaped '
+                         'without copying'.format(array.shape, array.strides))
+    return flat
+
+
+_PARSED_MODELS = {}
+
+
+def _parse_model(text):
+    """Parse model table into read-only frequency, squint and FWHM arrays.
+
+    Each table is parsed once per process and then shared, keyed on the
+    text itself so that changes to `KNOWN_MODELS` are picked up.
+    """
+    try:
+        return _PARSED_MODELS[text]
+    except KeyError:
+        pass
+    # Skip the two header lines with column names and units
+    rows = [line.split(',') for line in text.splitlines()[2:] if line.strip()]
+    table = np.array(rows, dtype=float)
+    freqMHzlist = table[:, 0]
+    # Shape (4, nfreq), where 4 refers to Hx,Hy,Vx,Vy components (and arcmin to degrees)
+    squintlist = table[:, 1:5].T / 60.
+    fwhmlist = table[:, 5:9].T / 60.
+    for array in (freqMHzlist, squintlist, fwhmlist):
+        array.flags.writeable = False
+    return _PARSED_MODELS.setdefault(text, (freqMHzlist, squintlist, fwhmlist))
 
 # --------------------------------------------------------------------------------------------------
 # --- CLASS :  JimBeam
@@ -143,11 +601,21 @@ class JimBeam(object):
     ----------
     name : str
         Name of model, must be either 'MKAT-AA-L-JIM-2020' or 'MKAT-AA-UHF-JIM-2020'
+    taper : {'exact', 'linear', 'cubic'}, optional
+        Backend used to evaluate the cosine taper. The 'linear' and 'cubic'
+        backends interpolate a precomputed table in squared radius, which is
+        faster for large grids, with a maximum absolute error of 2e-7 and 1e-9,
+        respectively.
+    dtype : {np.float64, np.float32}, optional
+        Floating-point type of the beam parameters, workspace and outputs.
+        Single precision halves the memory traffic, at an absolute error of
+        about 1e-6 in the beam (even if the coordinates are double precision).
 
     Raises
     ------
     ValueError
-        If `name` is an unknown model
+        If `name` is an unknown model, `taper` an unknown backend or `dtype`
+        not a floating-point type
 
     Request
     -------
@@ -166,13 +634,12 @@ class JimBeam(object):
 
       def showbeam(beam,freqMHz=1000,pol='H',beamextent=10.):
           margin=np.linspace(-beamextent/2.,beamextent/2.,128)
-          x,y=np.meshgrid(margin,margin)
           if pol=='H':
-              beampixels=beam.HH(x,y,freqMHz)
+              beampixels=beam.HH_grid(margin,margin,freqMHz)
           elif pol=='V':
-              beampixels=beam.VV(x,y,freqMHz)
+              beampixels=beam.VV_grid(margin,margin,freqMHz)
           else:
-              beampixels=beam.I(x,y,freqMHz)
+              beampixels=beam.I_grid(margin,margin,freqMHz)
               pol='I'
           plt.clf()
           plt.imshow(beampixels,extent=[-beamextent/2,beamextent/2,-beamextent/2,beamextent/2])
@@ -186,76 +653,1042 @@ class JimBeam(object):
     .. _link: https://books.google.co.za/books?id=Jg6hCwAAQBAJ
     """
 
-    def __init__(self, name='MKAT-AA-L-JIM-2020'):
+    def __init__(self, name='MKAT-AA-L-JIM-2020', taper='exact', dtype=np.float64):
+        # Guards insertion into (and eviction from) the parameter cache of shared beams
+        self._param_lock = threading.Lock()
         self.name = name
+        # Check the backend name early
+        _taper_function(taper)
+        self.taper = taper
+        self.dtype = dtype
         try:
-            csv_file = io.StringIO(KNOWN_MODELS[name])
+            text = KNOWN_MODELS[name]
         except KeyError:
             raise ValueError('Unknown model {!r}, available ones are {!r}'
                              .format(name, list(KNOWN_MODELS.keys())))
         else:
-            table = np.loadtxt(csv_file, skiprows=2, delimiter=',')
-        self.freqMHzlist = table[:, 0]
-        # Shape (4, nfreq), where 4 refers to Hx,Hy,Vx,Vy components (and arcmin to degrees)
-        self.squintlist = table[:, 1:5].T / 60.
-        self.fwhmlist = table[:, 5:9].T / 60.
-
-    def _interp_squint_fwhm(self, freqMHz):
-        squint = [np.interp(freqMHz, self.freqMHzlist, lst) for lst in self.squintlist]
-        fwhm = [np.interp(freqMHz, self.freqMHzlist, lst) for lst in self.fwhmlist]
-        return squint, fwhm
-
-    def HH(self, x, y, freqMHz):
+            # These read-only arrays are shared by all beams of the same model
+            self.freqMHzlist, self.squintlist, self.fwhmlist = _parse_model(text)
+
+    @property
+    def freqMHzlist(self):
+        """Frequencies at which the beam parameters are tabulated, in MHz."""
+        return self._freqMHzlist
+
+    @freqMHzlist.setter
+    def freqMHzlist(self, freqMHzlist):
+        self._freqMHzlist = freqMHzlist
+        self._invalidate_params()
+
+    @property
+    def squintlist(self):
+        """Pointing of Hx,Hy,Vx,Vy beam centres per frequency, shape (4, nfreq), in degrees."""
+        return self._squintlist
+
+    @squintlist.setter
+    def squintlist(self, squintlist):
+        self._squintlist = squintlist
+        self._invalidate_params()
+
+    @property
+    def fwhmlist(self):
+        """FWHM of Hx,Hy,Vx,Vy beams per frequency, shape (4, nfreq), in degrees."""
+        return self._fwhmlist
+
+    @fwhmlist.setter
+    def fwhmlist(self, fwhmlist):
+        self._fwhmlist = fwhmlist
+        self._invalidate_params()
+
+    @property
+    def dtype(self):
+        """Floating-point type of the beam evaluation."""
+        return self._dtype
+
+    @dtype.setter
+    def dtype(self, dtype):
+        dtype = np.dtype(dtype)
+        if dtype.kind != 'f':
+            raise ValueError('Beam dtype should be floating-point, not {}'.format(dtype))
+        self._dtype = dtype
+        self._invalidate_params()
+
+    # Shared beams handed out by get_beam refuse changes to their public attributes
+    _frozen = False
+
+    def __setattr__(self, name, value):
+        if self._frozen and not name.startswith('_'):
+            raise AttributeError('Shared beam {!r} is read-only, create a private JimBeam '
+                                 'to modify {!r}'.format(self.name, name))
+        object.__setattr__(self, name, value)
+
+    def _invalidate_params(self):
+        # Assigning new tables resets the cache (modifying them in place does not)
+        self._param_table = None
+        self._param_cache = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_param_table'] = None
+        state['_param_cache'] = {}
+        del state['_param_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._param_lock = threading.Lock()
+
+    def _interp_params(self, freqMHz):
+        """Interpolate squint and FWHM rows to the given frequencies.
+
+        Returns a read-only array of shape ``(8,) + np.shape(freqMHz)``, where
+        the 8 rows are the Hx,Hy,Vx,Vy squints followed by the Hx,Hy,Vx,Vy FWHMs.
+        Scalar frequencies are memoised, as the same frequency is typically
+        requested many times (per source or per tile).
+        """
+        scalar = np.ndim(freqMHz) == 0
+        if scalar:
+            key = float(freqMHz)
+            params = self._param_cache.get(key)
+            if params is not None:
+                return params
+        if self._param_table is None:
+            # Rows go first, ahead of any antenna axis, with frequency last
+            table = np.concatenate([self.squintlist, self.fwhmlist], axis=-2)
+            self._param_table = np.moveaxis(table, -2, 0).astype(self.dtype)
+        freqs = np.asarray(self.freqMHzlist)
+        freqMHz = np.asarray(freqMHz, dtype=float)
+        # A single search brackets each frequency for all 8 rows (clamped like np.interp)
+        lower = np.clip(np.searchsorted(freqs, freqMHz, side='right') - 1, 0, len(freqs) - 2)
+        weight = np.clip((freqMHz - freqs[lower]) / (freqs[lower + 1] - freqs[lower]), 0., 1.)
+        weight = weight.astype(self.dtype)
+        # np.take copies the bracketing columns, whereas indexing with a scalar frequency gives a view
+        params = np.take(self._param_table, lower, axis=-1)
+        params += weight * (np.take(self._param_table, lower + 1, axis=-1) - params)
+        params.flags.writeable = False
+        if scalar:
+            # Lookups are single dict operations and need no lock, but eviction iterates
+            # over the cache, so threads sharing the beam take turns to modify it
+            # (concurrent misses merely compute the same parameters twice)
+            with self._param_lock:
+                cache = self._param_cache
+                if key not in cache and len(cache) >= _PARAM_CACHE_SIZE:
+                    # Evict the oldest entry (insertion order)
+                    cache.pop(next(iter(cache)))
+                cache[key] = params
+        return params
+
+    def _rotate_params(self, params, parangle, leading=False):
+        """Append cosine and sine of parallactic angle to interpolated parameters.
+
+        Returns an array of shape ``(10,) + prefix``, where the time axes of
+        `parangle` are inserted after any antenna axes (or ahead of all axes
+        if `leading`) and ahead of the frequency axes of `params`. The
+        trigonometric functions are only evaluated once per parallactic angle.
+        """
+        angle = np.radians(np.asarray(parangle, dtype=float))
+        nmodel = 0 if leading else np.ndim(self.squintlist) - 2
+        model_shape, freq_shape = params.shape[1:1 + nmodel], params.shape[1 + nmodel:]
+        rotated = np.empty((10,) + model_shape + angle.shape + freq_shape, params.dtype)
+        rotated[:8] = params.reshape((8,) + model_shape + (1,) * angle.ndim + freq_shape)
+        trig_shape = (1,) * nmodel + angle.shape + (1,) * len(freq_shape)
+        rotated[8] = np.cos(angle).reshape(trig_shape)
+        rotated[9] = np.sin(angle).reshape(trig_shape)
+        return rotated
+
+    def _evaluate(self, x, y, params, which, out=None, scratch=None, workers=1, cutoff=None, fill=0.):
+        """Evaluate beam products tile by tile into preallocated outputs.
+
+        Parameters
+        ----------
+        x, y : arrays of float
+            Coordinates where beam is sampled, in degrees, broadcastable to a common shape
+        params : array of float, shape (8,) + prefix or (10,) + prefix
+            Beam parameters of :meth:`_interp_params` (and :meth:`_rotate_params`),
+            where `prefix` becomes the leading output axes (e.g. frequency)
+        which : sequence of str
+            Products to calculate, chosen from 'HH', 'VV', 'I' and 'Q'
+        out : sequence of arrays (or None), same length as `which`, optional
+            Output arrays of shape ``prefix + x.shape``, allocated if None
+        scratch : 1-D array, optional
+            Workspace with at least 4 samples per tile sample per worker, allocated if None
+        workers : int, optional
+            Number of threads evaluating tiles concurrently
+        cutoff : float, optional
+            Normalised radius beyond which beams are not evaluated
+        fill : float, optional
+            Value of products beyond the cutoff
+
+        Returns
+        -------
+        out : list of arrays of float, shape ``prefix + x.shape``
+            The requested products, in the order given by `which`
+        """
+        unknown = [product for product in which if product not in PRODUCTS]
+        if unknown:
+            raise ValueError('Unknown beam product(s) {!r}, available ones are {!r}'
+                             .format(unknown, list(PRODUCTS)))
+        if len(set(which)) != len(which):
+            raise ValueError('Beam products {!r} contain duplicates'.format(which))
+        if out is None:
+            out = [None] * len(which)
+        elif len(out) != len(which):
+            raise ValueError('Expected {} output arrays, got {}'.format(len(which), len(out)))
+        # Coordinates are not broadcast against each other, so that the per-axis
+        # terms of separable grids (e.g. sparse meshgrids) are only evaluated once
+        grid_shape = np.broadcast(x, y).shape
+        x, y = _expand_dims(x, len(grid_shape)), _expand_dims(y, len(grid_shape))
+        prefix = params.shape[1:]
+        shape = prefix + grid_shape
+        dtype = params.dtype
+        out = [np.empty(shape, dtype) if o is None else o for o in out]
+        for o in out:
+            if o.shape != shape:
+                raise ValueError('Output array has shape {}, expected {}'.format(o.shape, shape))
+        # Flatten prefix axes and give scalar coordinates a pixel axis
+        nprefix = int(np.prod(prefix))
+        if nprefix == 0 or int(np.prod(grid_shape)) == 0:
+            # Nothing to evaluate (and no tiles to size)
+            return out
+        if not grid_shape:
+            x, y, grid_shape = x.reshape(1), y.reshape(1), (1,)
+        flat_params = params.reshape((len(params), nprefix) + (1,) * len(grid_shape))
+        flat_out = dict((product, _flat_view(o, (nprefix,) + grid_shape)) for product, o in zip(which, out))
+        prefix_step, row_step, tile_size = _tile_steps(nprefix, grid_shape)
+        ntiles = -(-nprefix // prefix_step) * -(-grid_shape[0] // row_step)
+        workers = max(min(workers, ntiles), 1)
+        if scratch is None:
+            scratch = np.empty(workers * 4 * tile_size, dtype)
+        elif scratch.size < workers * 4 * tile_size:
+            raise ValueError('Scratch array has {} samples, needs at least {}'
+                             .format(scratch.size, workers * 4 * tile_size))
+        taper = _taper_function(self.taper, dtype)
+        tiling = (nprefix, grid_shape[0], prefix_step, row_step)
+        if workers == 1:
+            _evaluate_tiles(_tiles(*tiling), x, y, flat_params, flat_out, scratch, taper, cutoff, fill)
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            # Deal tiles out in turn to the threads, each with its own part of the workspace.
+            # NumPy ufuncs release the GIL, so the threads run concurrently.
+            with ThreadPoolExecutor(workers) as executor:
+                futures = [executor.submit(_evaluate_tiles, itertools.islice(_tiles(*tiling), n, None, workers),
+                                           x, y, flat_params, flat_out,
+                                           scratch[n * 4 * tile_size:(n + 1) * 4 * tile_size], taper,
+                                           cutoff, fill)
+                           for n in range(workers)]
+                for future in futures:
+                    future.result()
+        return out
+
+    def products(self, x, y, freqMHz, which=PRODUCTS, out=None, scratch=None, workers=1, cutoff=None, fill=0.,
+                 parangle=None):
+        """Calculate several beam products at the provided coordinates in one pass.
+
+        The frequency interpolation and the co-polarised patterns are shared
+        between all requested products, which are formed in place, tile by
+        tile, with only a small cache-resident workspace.
+
+        Parameters
+        ----------
+        x, y : arrays of float of the same shape
+            Coordinates where beam is sampled, in degrees
+        freqMHz : float or array of float
+            Frequency, in MHz. If this is an array, a beam cube is evaluated
+            in a single pass, with frequency axes ahead of coordinate axes.
+        which : sequence of str, optional
+            Products to calculate, chosen from 'HH', 'VV', 'I' and 'Q'
+        out : sequence of arrays of float, optional
+            Output arrays, one per product in `which` (None entries are allocated)
+        scratch : 1-D array of float, optional
+            Workspace that can be reused between calls to avoid allocations.
+            It needs 4 samples per output sample, up to 4 * `TILE_SIZE` per worker.
+        workers : int, optional
+            Number of threads evaluating tiles of the outputs concurrently. The
+            default evaluates all tiles in the calling thread.
+        cutoff : float, optional
+            Normalised radius (offset over FWHM per axis, 0.5 at half power)
+            beyond which the beams are not evaluated. Tiles that miss the main
+            lobes are skipped altogether. Use :func:`cutoff_radius` to find the
+            radius corresponding to a minimum beam level.
+        fill : float, optional
+            Value of products beyond the cutoff of their feed(s), e.g. NaN
+        parangle : float or array of float, optional
+            Parallactic angle, in degrees, by which the beam of an alt-az dish
+            is rotated on the sky (from x towards y). If this is an array, e.g.
+            over time, all angles are evaluated in the same pass, with their
+            axes ahead of the frequency axes.
+
+        Returns
+        -------
+        products : tuple of arrays of float, each of shape ``np.shape(parangle) + np.shape(freqMHz) + x.shape``
+            The requested products, in the order given by `which`. The Stokes Q
+            beam is the squint-driven leakage ``(HH**2 - VV**2) / 2``.
+
+        Raises
+        ------
+        ValueError
+            If `which` contains unknown or duplicate products, or `out` or
+            `scratch` are not suitable
+        """
+        params = self._interp_params(freqMHz)
+        if parangle is not None:
+            params = self._rotate_params(params, parangle)
+        results = self._evaluate(x, y, params, which, out, scratch, workers, cutoff, fill)
+        # Indexing with an empty tuple turns 0-d arrays into scalars (unless provided by caller)
+        out = [None] * len(which) if out is None else out
+        return tuple(r[()] if o is None else r for r, o in zip(results, out))
+
+    def HH(self, x, y, freqMHz, out=None, scratch=None, workers=1, cutoff=None, fill=0.,
+           parangle=None):
         """Calculate the H co-polarised beam at the provided coordinates.
 
         Parameters
         ----------
         x, y : arrays of float of the same shape
             Coordinates where beam is sampled, in degrees
-        freqMHz : float
-            Frequency, in MHz
+        freqMHz : float or array of float
+            Frequency, in MHz. If this is an array, a beam cube is evaluated
+            in a single pass, with frequency axes ahead of coordinate axes.
+        out : array of float, optional
+            Output array to fill in, allocated if None
+        scratch : 1-D array of float, optional
+            Workspace that can be reused between calls (see :meth:`products`)
+        workers : int, optional
+            Number of threads evaluating the beam concurrently
+        cutoff : float, optional
+            Normalised radius beyond which the beam is not evaluated (see :meth:`products`)
+        fill : float, optional
+            Value of beam beyond the cutoff
+        parangle : float or array of float, optional
+            Parallactic angle by which the beam is rotated, in degrees (see :meth:`products`)
 
         Returns
         -------
-        HH : array of float, same shape as `x` and `y`
+        HH : array of float, shape ``np.shape(parangle) + np.shape(freqMHz) + x.shape``
             The H co-polarised beam
         """
-        squint, fwhm = self._interp_squint_fwhm(freqMHz)
-        return _pattern(x, y, squint[0], squint[1], fwhm[0], fwhm[1])
+        return self.products(x, y, freqMHz, which=('HH',), out=[out], scratch=scratch,
+                             workers=workers, cutoff=cutoff, fill=fill, parangle=parangle)[0]
 
-    def VV(self, x, y, freqMHz):
+    def VV(self, x, y, freqMHz, out=None, scratch=None, workers=1, cutoff=None, fill=0.,
+           parangle=None):
         """Calculate the V co-polarised beam at the provided coordinates.
 
         Parameters
         ----------
         x, y : arrays of float of the same shape
             Coordinates where beam is sampled, in degrees
-        freqMHz : float
-            Frequency, in MHz
+        freqMHz : float or array of float
+            Frequency, in MHz. If this is an array, a beam cube is evaluated
+            in a single pass, with frequency axes ahead of coordinate axes.
+        out : array of float, optional
+            Output array to fill in, allocated if None
+        scratch : 1-D array of float, optional
+            Workspace that can be reused between calls (see :meth:`products`)
+        workers : int, optional
+            Number of threads evaluating the beam concurrently
+        cutoff : float, optional
+            Normalised radius beyond which the beam is not evaluated (see :meth:`products`)
+        fill : float, optional
+            Value of beam beyond the cutoff
+        parangle : float or array of float, optional
+            Parallactic angle by which the beam is rotated, in degrees (see :meth:`products`)
 
         Returns
         -------
-        VV : array of float, same shape as `x` and `y`
+        VV : array of float, shape ``np.shape(parangle) + np.shape(freqMHz) + x.shape``
             The V co-polarised beam
         """
-        squint, fwhm = self._interp_squint_fwhm(freqMHz)
-        return _pattern(x, y, squint[2], squint[3], fwhm[2], fwhm[3])
+        return self.products(x, y, freqMHz, which=('VV',), out=[out], scratch=scratch,
+                             workers=workers, cutoff=cutoff, fill=fill, parangle=parangle)[0]
 
-    def I(self, x, y, freqMHz):  # noqa: E741, E743
+    def I(self, x, y, freqMHz, out=None, scratch=None, workers=1, cutoff=None, fill=0.,  # noqa: E741, E743
+          parangle=None):
         """Calculate the Stokes I beam at the provided coordinates.
 
         Parameters
         ----------
         x, y : arrays of float of the same shape
             Coordinates where beam is sampled, in degrees
-        freqMHz : float
-            Frequency, in MHz
+        freqMHz : float or array of float
+            Frequency, in MHz. If this is an array, a beam cube is evaluated
+            in a single pass, with frequency axes ahead of coordinate axes.
+        out : array of float, optional
+            Output array to fill in, allocated if None
+        scratch : 1-D array of float, optional
+            Workspace that can be reused between calls (see :meth:`products`)
+        workers : int, optional
+            Number of threads evaluating the beam concurrently
+        cutoff : float, optional
+            Normalised radius beyond which the beam is not evaluated (see :meth:`products`)
+        fill : float, optional
+            Value of beam beyond the cutoff
+        parangle : float or array of float, optional
+            Parallactic angle by which the beam is rotated, in degrees (see :meth:`products`)
 
         Returns
         -------
-        I : array of float, same shape as `x` and `y`
+        I : array of float, shape ``np.shape(parangle) + np.shape(freqMHz) + x.shape``
             The Stokes I beam (non-negative)
         """
-        H = self.HH(x, y, freqMHz)
-        V = self.VV(x, y, freqMHz)
-        return 0.5 * (np.abs(H)**2 + np.abs(V)**2)
+        return self.products(x, y, freqMHz, which=('I',), out=[out], scratch=scratch,
+                             workers=workers, cutoff=cutoff, fill=fill, parangle=parangle)[0]
+
+    def HH_grid(self, xaxis, yaxis, freqMHz, out=None, scratch=None, workers=1, cutoff=None, fill=0.,
+                parangle=None):
+        """Calculate the H co-polarised beam on a regular grid given by its axes.
+
+        This is equivalent to ``HH(*np.meshgrid(xaxis, yaxis), freqMHz)``, but
+        the squared offsets along each axis are evaluated once per axis (and
+        channel) and combined by broadcasting, without forming the meshgrid.
+        The same fast path applies if :meth:`HH` is given a sparse meshgrid.
+
+        Parameters
+        ----------
+        xaxis, yaxis : 1-D arrays of float
+            Coordinates of grid columns and rows, in degrees
+        freqMHz : float or array of float
+            Frequency, in MHz (frequency axes come ahead of the grid axes)
+        out : array of float, optional
+            Output array to fill in, allocated if None
+        scratch : 1-D array of float, optional
+            Workspace that can be reused between calls (see :meth:`products`)
+        workers : int, optional
+            Number of threads evaluating the beam concurrently
+        cutoff : float, optional
+            Normalised radius beyond which the beam is not evaluated (see :meth:`products`)
+        fill : float, optional
+            Value of beam beyond the cutoff
+        parangle : float or array of float, optional
+            Parallactic angle by which the beam is rotated, in degrees (see :meth:`products`)
+
+        Returns
+        -------
+        HH : array of float, shape ``np.shape(parangle) + np.shape(freqMHz) + (len(yaxis), len(xaxis))``
+            The H co-polarised beam
+        """
+        x, y = _grid_axes(xaxis, yaxis)
+        return self.HH(x, y, freqMHz, out, scratch, workers, cutoff, fill, parangle)
+
+    def VV_grid(self, xaxis, yaxis, freqMHz, out=None, scratch=None, workers=1, cutoff=None, fill=0.,
+                parangle=None):
+        """Calculate the V co-polarised beam on a regular grid (see :meth:`HH_grid`)."""
+        x, y = _grid_axes(xaxis, yaxis)
+        return self.VV(x, y, freqMHz, out, scratch, workers, cutoff, fill, parangle)
+
+    def I_grid(self, xaxis, yaxis, freqMHz, out=None, scratch=None, workers=1, cutoff=None, fill=0.,
+               parangle=None):
+        """Calculate the Stokes I beam on a regular grid (see :meth:`HH_grid`)."""
+        x, y = _grid_axes(xaxis, yaxis)
+        return self.I(x, y, freqMHz, out, scratch, workers, cutoff, fill, parangle)
+
+    def jones(self, l, m, freqMHz, out=None, dtype=None, parangle=None, workers=1):  # noqa: E741
+        """Beam Jones matrices in the layout of direction-dependent calibration solvers.
+
+        The matrices are diagonal, with the H and V co-polarised beams on the
+        diagonal and zero cross-hand terms. The beams are evaluated straight
+        into the real parts of the diagonal of the output array, without
+        intermediate copies. The output axes follow the (time, antenna,
+        channel, direction, 2, 2) layout, where the time axes come from
+        `parangle` and the antenna axis is only present for
+        :class:`JimBeamArray`.
+
+        Parameters
+        ----------
+        l, m : arrays of float
+            Directions where the beam is sampled, in degrees, broadcast against each other
+        freqMHz : float or array of float
+            Channel frequencies, in MHz
+        out : array of complex, optional
+            Output array with the shape described below (and a contiguous
+            last axis), allocated if None
+        dtype : {np.complex64, np.complex128}, optional
+            Complex type of the allocated output (matching the beam dtype by default)
+        parangle : float or array of float, optional
+            Parallactic angle, in degrees, e.g. per time (see :meth:`products`)
+        workers : int, optional
+            Number of threads evaluating the beam concurrently
+
+        Returns
+        -------
+        jones : array of complex, shape ``np.shape(parangle) + (nant,) + np.shape(freqMHz) + l.shape + (2, 2)``
+            Beam Jones matrices (without the `nant` axis for single beams)
+
+        Raises
+        ------
+        ValueError
+            If `out` is not a suitable complex array
+        """
+        params = self._interp_params(freqMHz)
+        if parangle is not None:
+            params = self._rotate_params(params, parangle, leading=True)
+        shape = params.shape[1:] + np.broadcast(l, m).shape + (2, 2)
+        if out is None:
+            if dtype is None:
+                dtype = np.result_type(self.dtype, np.complex64)
+            out = np.empty(shape, dtype)
+        if out.dtype.kind != 'c':
+            raise ValueError('Jones array should be complex, not {}'.format(out.dtype))
+        if out.shape != shape:
+            raise ValueError('Jones array has shape {}, expected {}'.format(out.shape, shape))
+        out[...] = 0
+        # View the real and imaginary parts as separate floats: [[Hr, Hi, 0, 0], [0, 0, Vr, Vi]]
+        parts = out.view(out.real.dtype)
+        self._evaluate(l, m, params, ('HH', 'VV'), [parts[..., 0, 0], parts[..., 1, 2]],
+                       workers=workers)
+        return out
+
+    def sparse(self, x, y, freqMHz, cutoff, pol='I', workers=1):
+        """Evaluate a beam product only within a cutoff radius, in sparse form.
+
+        The beam is evaluated in blocks of channels (or other leading axes of
+        `freqMHz`), skipping tiles and pixels beyond the cutoff, and only the
+        samples inside the cutoff of the feed(s) involved are kept.
+
+        Parameters
+        ----------
+        x, y : arrays of float
+            Coordinates where beam is sampled, in degrees, broadcast against each other
+        freqMHz : float or array of float
+            Frequency, in MHz
+        cutoff : float
+            Normalised radius beyond which the beam is dropped (see :func:`cutoff_radius`)
+        pol : {'I', 'HH', 'VV', 'Q'}, optional
+            Beam product to evaluate
+        workers : int, optional
+            Number of threads evaluating each block concurrently
+
+        Returns
+        -------
+        indices : tuple of arrays of int
+            Indices of the kept samples into the dense output of shape
+            ``np.shape(freqMHz) + x.shape`` (with a leading antenna axis for
+            :class:`JimBeamArray`), one array per axis (like :func:`np.nonzero`)
+        values : 1-D array of float
+            Beam values of the kept samples
+        """
+        params = self._interp_params(freqMHz)
+        prefix = params.shape[1:]
+        nprefix = int(np.prod(prefix))
+        grid_shape = np.broadcast(x, y).shape
+        plane_size = int(np.prod(grid_shape))
+        flat_params = params.reshape(8, nprefix)
+        block = min(max(_CUBE_BLOCK_BYTES // max(plane_size * self.dtype.itemsize, 1), 1), nprefix)
+        buffer = np.empty((block,) + grid_shape, self.dtype)
+        tile_size = _tile_steps(block, grid_shape or (1,))[2]
+        scratch = np.empty(workers * 4 * tile_size, self.dtype)
+        indices, values = [], []
+        for start in range(0, nprefix, block):
+            planes = buffer[:min(block, nprefix - start)]
+            # Mark samples beyond the cutoff with NaN, which is never a beam value
+            self._evaluate(x, y, flat_params[:, start:start + len(planes)], (pol,), [planes],
+                           scratch, workers, cutoff, np.nan)
+            kept = np.flatnonzero(planes == planes)
+            indices.append(kept + start * plane_size)
+            values.append(planes.ravel()[kept])
+        indices = np.concatenate(indices) if indices else np.zeros(0, int)
+        values = np.concatenate(values) if values else np.zeros(0, self.dtype)
+        shape = prefix + grid_shape
+        return (np.unravel_index(indices, shape) if shape else ()), values
+
+    def band_average(self, x, y, freqMHz, widthMHz, pol='I', nodes=8, response=None, out=None, workers=1):
+        """Average beam across the bandwidth of each channel.
+
+        The beam is integrated over each channel with Gauss-Legendre
+        quadrature. The quadrature nodes of all channels form an extra
+        frequency axis of a single tiled evaluation (in blocks of channels of
+        up to 64 MB), which is reduced in place to the weighted average.
+
+        Parameters
+        ----------
+        x, y : arrays of float
+            Coordinates where beam is sampled, in degrees, broadcast against each other
+        freqMHz : float or array of float
+            Channel centre frequencies, in MHz
+        widthMHz : float or array of float
+            Channel widths, in MHz (broadcast against `freqMHz`)
+        pol : {'I', 'HH', 'VV', 'Q'}, optional
+            Beam product to average
+        nodes : int, optional
+            Number of quadrature nodes per channel
+        response : callable, optional
+            Channel response as a function of frequency offset from the
+            centre, in units of channel width (from -0.5 to 0.5), which
+            weights the average (uniform by default)
+        out : array of float, optional
+            Output array to fill in, allocated if None
+        workers : int, optional
+            Number of threads evaluating each block concurrently
+
+        Returns
+        -------
+        average : array of float, shape ``np.broadcast(freqMHz, widthMHz).shape + x.shape``
+            Band-averaged beam (with a leading antenna axis for :class:`JimBeamArray`)
+
+        Raises
+        ------
+        ValueError
+            If `pol` is an unknown product or `out` is not suitable
+        """
+        if pol not in PRODUCTS:
+            raise ValueError('Unknown beam product {!r}, available ones are {!r}'
+                             .format(pol, list(PRODUCTS)))
+        freqMHz, widthMHz = np.broadcast_arrays(np.asarray(freqMHz, dtype=float),
+                                                np.asarray(widthMHz, dtype=float))
+        # Nodes and weights on the channel, scaled to [-0.5, 0.5] and unit sum
+        offsets, weights = np.polynomial.legendre.leggauss(nodes)
+        offsets *= 0.5
+        if response is not None:
+            weights = weights * response(offsets)
+        weights = (weights / weights.sum()).astype(self.dtype)
+        grid_shape = np.broadcast(x, y).shape
+        # Antennas of array beams are averaged like extra channels
+        model_shape = np.shape(self.squintlist)[:-2]
+        nchan = int(np.prod(model_shape)) * freqMHz.size
+        shape = model_shape + freqMHz.shape + grid_shape
+        allocated = out is None
+        if allocated:
+            out = np.empty(shape, self.dtype)
+        elif out.shape != shape:
+            raise ValueError('Output array has shape {}, expected {}'.format(out.shape, shape))
+        flat_out = _flat_view(out, (nchan,) + grid_shape)
+        params = self._interp_params(freqMHz.reshape(-1, 1) + widthMHz.reshape(-1, 1) * offsets)
+        params = params.reshape(8, nchan, nodes)
+        node_size = max(int(np.prod(grid_shape)), 1) * nodes * self.dtype.itemsize
+        block = min(max(_CUBE_BLOCK_BYTES // node_size, 1), nchan)
+        samples = np.empty((block, nodes) + grid_shape, self.dtype)
+        tile_size = _tile_steps(block * nodes, grid_shape or (1,))[2]
+        scratch = np.empty(workers * 4 * tile_size, self.dtype)
+        for start in range(0, nchan, block):
+            average = flat_out[start:start + block]
+            planes = samples[:len(average)]
+            self._evaluate(x, y, params[:, start:start + block], (pol,), [planes], scratch, workers)
+            np.multiply(planes[:, 0], weights[0], out=average)
+            for node in range(1, nodes):
+                plane = planes[:, node]
+                plane *= weights[node]
+                average += plane
+        # Indexing with an empty tuple turns 0-d arrays into scalars (unless provided by caller)
+        return out[()] if allocated else out
+
+    def imaging_beam(self, x, y, freqMHz, pointing_rms, n_samples=100, seed=None, pol='I',
+                     variance=False, workers=1):
+        """Average beam over random antenna pointing errors (Monte Carlo).
+
+        This is the nett 'imaging primary beam' of note (c) in the class
+        docstring. Pointing offsets are drawn from a circular Gaussian and
+        added to the beam centres of both feeds. The realisations become a
+        leading axis of the usual tiled evaluation and are evaluated in
+        batches of up to 64 MB, which are folded into the mean (and the sum
+        of squared deviations, via Welford's update) in place.
+
+        Parameters
+        ----------
+        x, y : arrays of float
+            Coordinates where beam is sampled, in degrees, broadcast against each other
+        freqMHz : float or array of float
+            Frequency, in MHz (frequency axes come ahead of coordinate axes)
+        pointing_rms : float
+            Standard deviation of the pointing error along each axis, in degrees
+        n_samples : int, optional
+            Number of pointing realisations
+        seed : int or None, optional
+            Seed of the random pointing offsets, for reproducible beams
+        pol : {'I', 'HH', 'VV', 'Q'}, optional
+            Beam product to average
+        variance : bool, optional
+            True to also return the variance of the beam over realisations
+        workers : int, optional
+            Number of threads evaluating each batch concurrently
+
+        Returns
+        -------
+        mean : array of float, shape ``np.shape(freqMHz) + x.shape``
+            Average beam over the realisations
+        var : array of float, same shape as `mean`
+            Variance of the beam over the realisations (only if `variance`)
+
+        Raises
+        ------
+        ValueError
+            If `pol` is an unknown product or `n_samples` is not positive
+        """
+        if pol not in PRODUCTS:
+            raise ValueError('Unknown beam product {!r}, available ones are {!r}'
+                             .format(pol, list(PRODUCTS)))
+        if n_samples < 1:
+            raise ValueError('Need at least one pointing realisation, got {}'.format(n_samples))
+        params = self._interp_params(freqMHz)
+        shape = params.shape[1:] + np.broadcast(x, y).shape
+        offsets = np.random.RandomState(seed).normal(0., pointing_rms, (2, n_samples))
+        offsets = offsets.astype(self.dtype).reshape((2, n_samples) + (1,) * (params.ndim - 1))
+        block_size = max(int(np.prod(shape)), 1) * self.dtype.itemsize
+        block = min(max(_SAMPLE_BLOCK_BYTES // block_size, 1), n_samples)
+        # Parameters, outputs and workspace are allocated once and reused by every batch
+        batch_params = np.empty((8, block) + params.shape[1:], self.dtype)
+        samples = np.empty((block,) + shape, self.dtype)
+        tile_size = _tile_steps(block * int(np.prod(params.shape[1:])), shape[params.ndim - 1:] or (1,))[2]
+        scratch = np.empty(workers * 4 * tile_size, self.dtype)
+        # Accumulate in double precision, which keeps single-precision beams accurate
+        mean = np.zeros(shape)
+        if variance:
+            # Sum of squared deviations from the running mean, and its workspace
+            m2, delta, work = np.zeros(shape), np.empty(shape), np.empty(shape)
+        for start in range(0, n_samples, block):
+            dx, dy = offsets[:, start:start + block]
+            batch = batch_params[:, :len(dx)]
+            batch[:] = params[:, np.newaxis]
+            # Shift the Hx,Vx and Hy,Vy squints, i.e. the beam centres of both feeds
+            batch[0:4:2] += dx
+            batch[1:4:2] += dy
+            planes = samples[:len(dx)]
+            self._evaluate(x, y, batch, (pol,), [planes], scratch, workers)
+            if not variance:
+                mean += planes.sum(axis=0, dtype=mean.dtype)
+                continue
+            for n, plane in enumerate(planes, start + 1):
+                # Welford's update avoids the cancellation of E[b^2] - E[b]^2 for small variances
+                np.subtract(plane, mean, out=delta)
+                m2 += np.multiply(np.square(delta, out=work), (n - 1.) / n, out=work)
+                mean += np.multiply(delta, 1. / n, out=delta)
+        if not variance:
+            mean /= n_samples
+            return mean.astype(self.dtype)[()]
+        m2 /= n_samples
+        return mean.astype(self.dtype)[()], m2.astype(self.dtype)[()]
+
+    def iter_channels(self, x, y, freqMHz, pol='I', block=1, workers=1):
+        """Evaluate a beam cube as a stream of blocks of channels.
+
+        The blocks are evaluated into a single output buffer (and workspace)
+        that is reused for every block, which keeps memory use flat while
+        downstream code consumes the cube block by block. Copy the planes if
+        they are needed beyond the next iteration.
+
+        Parameters
+        ----------
+        x, y : arrays of float
+            Coordinates where beam is sampled, in degrees, broadcast against each other
+        freqMHz : 1-D array of float
+            Frequencies of cube channels, in MHz
+        pol : {'I', 'HH', 'VV', 'Q'}, optional
+            Beam product to evaluate
+        block : int, optional
+            Number of channels per block
+        workers : int, optional
+            Number of threads evaluating each block concurrently
+
+        Yields
+        ------
+        freq_block : 1-D array of float
+            Frequencies of the channels in the block, in MHz
+        planes : array of float, shape ``(len(freq_block),) + x.shape``
+            Beam planes of the channels in the block (overwritten by the next
+            block), with a leading antenna axis for :class:`JimBeamArray`
+        """
+        freqMHz = np.atleast_1d(np.asarray(freqMHz, dtype=float))
+        shape = np.broadcast(x, y).shape
+        model_shape = np.shape(self.squintlist)[:-2]
+        nmodel, block_size = int(np.prod(model_shape)), min(block, len(freqMHz))
+        # A flat buffer keeps the planes of short (final) blocks contiguous behind the antenna axis
+        buffer = np.empty(nmodel * block_size * int(np.prod(shape)), self.dtype)
+        tile_size = _tile_steps(nmodel * block_size, shape or (1,))[2]
+        scratch = np.empty(workers * 4 * tile_size, self.dtype)
+        for start in range(0, len(freqMHz), block):
+            freq_block = freqMHz[start:start + block]
+            planes_shape = model_shape + (len(freq_block),) + shape
+            planes = buffer[:int(np.prod(planes_shape))].reshape(planes_shape)
+            self.products(x, y, freq_block, which=(pol,), out=[planes], scratch=scratch, workers=workers)
+            yield freq_block, planes
+
+    def write_cube(self, path, freqMHz, grid, pols=('I',), block=None, workers=1):
+        """Write a beam cube to disk, streaming one block of channels at a time.
+
+        The cube is stored as an .npy file at `path`, which is memory-mapped
+        and filled in place block by block, so that memory use stays bounded
+        by a block regardless of cube size. A header with the model name,
+        products, frequencies and grid is saved alongside in an .npz file
+        (see :func:`katbeam.cube.read_cube`).
+
+        Parameters
+        ----------
+        path : str
+            Name of .npy file to create
+        freqMHz : 1-D array of float
+            Frequencies of cube channels, in MHz
+        grid : pair of arrays of float
+            Coordinates `x` and `y` where beam is sampled, in degrees. These are
+            broadcast against each other, and stored in the header as given.
+        pols : sequence of str, optional
+            Beam products to store, chosen from 'HH', 'VV', 'I' and 'Q'
+        block : int, optional
+            Number of channels per block (by default up to 64 MB per block)
+        workers : int, optional
+            Number of threads evaluating each block concurrently
+
+        Returns
+        -------
+        cube : :class:`numpy.memmap` of float, shape ``(npols, nfreq) + grid shape``
+            Memory map of the cube file
+
+        Raises
+        ------
+        TypeError
+            If this is a :class:`JimBeamArray`, as cube files hold single beams
+        """
+        from .cube import header_path
+
+        _check_single_beam(self, 'write_cube')
+        freqMHz = np.atleast_1d(np.asarray(freqMHz, dtype=float))
+        x, y = grid
+        pols = tuple(pols)
+        shape = (len(pols), len(freqMHz)) + np.broadcast(x, y).shape
+        if block is None:
+            channel_bytes = int(np.prod(shape[:1] + shape[2:])) * self.dtype.itemsize
+            block = max(_CUBE_BLOCK_BYTES // max(channel_bytes, 1), 1)
+        np.savez(header_path(path), model=self.name, pols=pols, freqMHz=freqMHz,
+                 x=x, y=y, dtype=self.dtype.str, taper=self.taper)
+        cube = np.lib.format.open_memmap(path, mode='w+', dtype=self.dtype, shape=shape)
+        for start in range(0, len(freqMHz), block):
+            self.products(x, y, freqMHz[start:start + block], which=pols,
+                          out=[c[start:start + block] for c in cube], workers=workers)
+            # Write back dirty pages so that they do not accumulate in memory
+            cube.flush()
+        return cube
+
+    def dask_cube(self, x, y, freqMHz, pol='I', chunks='auto'):
+        """Lazily evaluate a beam cube as a dask array.
+
+        Each chunk of the cube is only evaluated when computed, for the
+        channels and pixels of that chunk, so that the full cube never needs
+        to be materialised. This requires the optional `dask` package.
+
+        Parameters
+        ----------
+        x, y : arrays of float
+            Coordinates where beam is sampled, in degrees. These are broadcast
+            against each other, which allows cheap regular grids like those of
+            ``np.meshgrid(xaxis, yaxis, sparse=True)``.
+        freqMHz : 1-D array of float
+            Frequencies of cube channels, in MHz
+        pol : {'I', 'HH', 'VV', 'Q'}, optional
+            Beam product to evaluate
+        chunks : int, tuple or str, optional
+            Chunks of the cube along frequency and coordinate axes, in any form
+            accepted by :func:`dask.array.core.normalize_chunks`
+
+        Returns
+        -------
+        cube : :class:`dask.array.Array` of float, shape ``(nfreq,) + x.shape``
+            The lazy beam cube
+
+        Raises
+        ------
+        TypeError
+            If this is a :class:`JimBeamArray`, as the chunks hold single beams
+        """
+        _check_single_beam(self, 'dask_cube')
+        import dask.array as da
+
+        if pol not in PRODUCTS:
+            raise ValueError('Unknown beam product {!r}, available ones are {!r}'
+                             .format(pol, list(PRODUCTS)))
+        freqMHz = np.atleast_1d(np.asarray(freqMHz, dtype=float))
+        shape = (len(freqMHz),) + np.broadcast(x, y).shape
+        chunks = da.core.normalize_chunks(chunks, shape, dtype=self.dtype)
+        freq_chunks, coord_chunks = chunks[0], chunks[1:]
+
+        def coordinates(c):
+            # Add leading axes and only chunk the axes that are not broadcast
+            c = np.asarray(c)
+            c = c.reshape((1,) * (len(coord_chunks) - c.ndim) + c.shape)
+            return da.from_array(c, chunks=tuple(ch if n > 1 else (1,)
+                                                 for ch, n in zip(coord_chunks, c.shape)))
+
+        def block(freqs, x, y):
+            return self.products(x[0], y[0], freqs.ravel(), which=(pol,))[0]
+
+        freqs = da.from_array(freqMHz, chunks=(freq_chunks,))
+        freqs = freqs.reshape((len(freqMHz),) + (1,) * len(coord_chunks))
+        return da.map_blocks(block, freqs, coordinates(x)[np.newaxis], coordinates(y)[np.newaxis],
+                             dtype=self.dtype, chunks=chunks)
+
+
+class JimBeamArray(JimBeam):
+    """Beam models of an array of antennas, evaluated together.
+
+    This holds separate squint and FWHM tables per antenna, tabulated at the
+    frequencies of a known model, and evaluates the beams of all antennas in
+    a single pass. The antenna axis becomes the first axis of all outputs,
+    ahead of any frequency axes, e.g. ``HH(x, y, freqMHz)`` has shape
+    ``(nant,) + np.shape(freqMHz) + x.shape``. Each antenna can also have
+    its own coordinates by passing `per_antenna` to the evaluation methods.
+    Cube files and dask cubes (:meth:`write_cube`, :meth:`dask_cube` and
+    :func:`katbeam.cube.generate`) only hold single beams and raise TypeError.
+
+    Parameters
+    ----------
+    squintlist : array of float, shape (nant, 4, nfreq)
+        Pointing of Hx,Hy,Vx,Vy beam centres per antenna and frequency, in degrees
+    fwhmlist : array of float, shape (nant, 4, nfreq)
+        FWHM of Hx,Hy,Vx,Vy beams per antenna and frequency, in degrees
+    name : str, optional
+        Name of the model providing the tabulated frequencies
+    taper : {'exact', 'linear', 'cubic'}, optional
+        Backend used to evaluate the cosine taper
+    dtype : {np.float64, np.float32}, optional
+        Floating-point type of the beam evaluation
+
+    Raises
+    ------
+    ValueError
+        If `name` is an unknown model, or the tables do not match each other
+        or the frequencies of the model
+    """
+
+    def __init__(self, squintlist, fwhmlist, name='MKAT-AA-L-JIM-2020', taper='exact', dtype=np.float64):
+        super(JimBeamArray, self).__init__(name, taper, dtype)
+        squintlist = np.asarray(squintlist, dtype=float)
+        fwhmlist = np.asarray(fwhmlist, dtype=float)
+        expected = (len(squintlist), 4, len(self.freqMHzlist))
+        if squintlist.shape != expected or fwhmlist.shape != expected:
+            raise ValueError('Expected squint and FWHM tables of shape {}, got {} and {}'
+                             .format(expected, squintlist.shape, fwhmlist.shape))
+        self.squintlist = squintlist
+        self.fwhmlist = fwhmlist
+
+    @classmethod
+    def from_beams(cls, beams):
+        """Combine single-antenna beams of the same model into an array beam."""
+        beams = list(beams)
+        return cls([beam.squintlist for beam in beams], [beam.fwhmlist for beam in beams],
+                   beams[0].name, beams[0].taper, beams[0].dtype)
+
+    @property
+    def nant(self):
+        """Number of antennas."""
+        return len(self.squintlist)
+
+    def products(self, x, y, freqMHz, which=PRODUCTS, out=None, scratch=None, workers=1,
+                 cutoff=None, fill=0., parangle=None, per_antenna=False):
+        """Calculate several beam products of all antennas in one pass.
+
+        Parameters
+        ----------
+        x, y : arrays of float
+            Coordinates where beam is sampled, in degrees. If `per_antenna`
+            is True, their first axis has length `nant` and selects the
+            coordinates of each antenna.
+        freqMHz : float or array of float
+            Frequency, in MHz
+        which : sequence of str, optional
+            Products to calculate, chosen from 'HH', 'VV', 'I' and 'Q'
+        out : sequence of arrays of float, optional
+            Output arrays, one per product in `which` (None entries are allocated)
+        scratch : 1-D array of float, optional
+            Workspace that can be reused between calls (see :meth:`JimBeam.products`)
+        workers : int, optional
+            Number of threads evaluating tiles of the outputs concurrently
+        cutoff : float, optional
+            Normalised radius beyond which the beams are not evaluated
+        fill : float, optional
+            Value of products beyond the cutoff
+        parangle : float or array of float, optional
+            Parallactic angle by which the beams are rotated, in degrees. Its
+            axes come after the antenna axis and ahead of the frequency axes.
+        per_antenna : bool, optional
+            True if the coordinates have a leading antenna axis
+
+        Returns
+        -------
+        products : tuple of arrays of float
+            The requested products, in the order given by `which`, each of
+            shape ``(nant,) + np.shape(parangle) + np.shape(freqMHz) + coordinate shape``, where
+            the coordinate shape excludes the antenna axis if `per_antenna`
+        """
+        if not per_antenna:
+            return super(JimBeamArray, self).products(x, y, freqMHz, which, out, scratch, workers,
+                                                      cutoff, fill, parangle)
+        x, y = np.broadcast_arrays(x, y)
+        if x.ndim == 0 or len(x) != self.nant:
+            raise ValueError('Per-antenna coordinates should have a first axis of length {}, '
+                             'got shape {}'.format(self.nant, x.shape))
+        params = self._interp_params(freqMHz)
+        if parangle is not None:
+            params = self._rotate_params(params, parangle)
+        shape = params.shape[1:] + x.shape[1:]
+        out = [np.empty(shape, self.dtype) if o is None else o for o in out or [None] * len(which)]
+        if scratch is None:
+            # Share the workspace between antennas
+            tile_size = _tile_steps(int(np.prod(params.shape[2:])), x.shape[1:] or (1,))[2]
+            scratch = np.empty(max(workers, 1) * 4 * tile_size, self.dtype)
+        for ant in range(self.nant):
+            self._evaluate(x[ant], y[ant], params[:, ant], which, [o[ant] for o in out],
+                           scratch, workers, cutoff, fill)
+        return tuple(out)
+
+    def HH(self, x, y, freqMHz, out=None, scratch=None, workers=1, cutoff=None, fill=0.,
+           parangle=None, per_antenna=False):
+        """Calculate the H co-polarised beams of all antennas (see :meth:`products`)."""
+        return self.products(x, y, freqMHz, which=('HH',), out=[out], scratch=scratch,
+                             workers=workers, cutoff=cutoff, fill=fill, parangle=parangle,
+                             per_antenna=per_antenna)[0]
+
+    def VV(self, x, y, freqMHz, out=None, scratch=None, workers=1, cutoff=None, fill=0.,
+           parangle=None, per_antenna=False):
+        """Calculate the V co-polarised beams of all antennas (see :meth:`products`)."""
+        return self.products(x, y, freqMHz, which=('VV',), out=[out], scratch=scratch,
+                             workers=workers, cutoff=cutoff, fill=fill, parangle=parangle,
+                             per_antenna=per_antenna)[0]
+
+    def I(self, x, y, freqMHz, out=None, scratch=None, workers=1, cutoff=None, fill=0.,  # noqa: E741, E743
+          parangle=None, per_antenna=False):
+        """Calculate the Stokes I beams of all antennas (see :meth:`products`)."""
+        return self.products(x, y, freqMHz, which=('I',), out=[out], scratch=scratch,
+                             workers=workers, cutoff=cutoff, fill=fill, parangle=parangle,
+                             per_antenna=per_antenna)[0]
+
+
+# Shared beams of get_beam, keyed on (name, taper, dtype)
+_BEAMS = {}
+_BEAMS_LOCK = threading.Lock()
+
+
+def get_beam(name='MKAT-AA-L-JIM-2020', taper='exact', dtype=np.float64):
+    """Shared, read-only beam model of the given name.
+
+    The beam is constructed on first request and then reused by all threads
+    in the process, which avoids repeated construction in e.g. request
+    handlers. Its parameter tables are read-only arrays and its attributes
+    cannot be reassigned; create a private :class:`JimBeam` to modify a model.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of beam model
+    taper : {'exact', 'linear', 'cubic'}, optional
+        Backend used to evaluate the cosine taper
+    dtype : {np.float64, np.float32}, optional
+        Floating-point type of the beam evaluation
+
+    Returns
+    -------
+    beam : :class:`JimBeam` object
+        The shared beam model
+
+    Raises
+    ------
+    ValueError
+        If `name` is an unknown model, `taper` an unknown backend or `dtype`
+        not a floating-point type
+    """
+    key = (name, taper, np.dtype(dtype).str)
+    beam = _BEAMS.get(key)
+    if beam is None:
+        with _BEAMS_LOCK:
+            beam = _BEAMS.get(key)
+            if beam is None:
+                beam = JimBeam(name, taper, dtype)
+                beam._frozen = True
+                _BEAMS[key] = beam
+    return beam
@@ -38,9 +38,8 @@ setup(name="katbeam",
           "License :: OSI Approved :: BSD License",
           "Operating System :: OS Independent",
           "Programming Language :: Python",
-          "Programming Language :: Python :: 2",
-          "Programming Language :: Python :: 2.7",
           "Programming Language :: Python :: 3",
+          "Programming Language :: Python :: 3 :: Only",
           "Programming Language :: Python :: 3.4",
           "Programming Language :: Python :: 3.5",
           "Programming Language :: Python :: 3.6",
@@ -51,10 +50,13 @@ setup(name="katbeam",
       platforms=["OS Independent"],
       keywords="meerkat ska",
       zip_safe=False,
-      python_requires=">=2.7, !=3.0.*, !=3.1.*, !=3.2.*, !=3.3.*, <4",
+      python_requires=">=3.4, <4",
       setup_requires=["katversion"],
       use_katversion=True,
       install_requires=[
           "numpy",
       ],
+      extras_require={
+          "dask": ["dask[array]"],
+      },
       )
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from katbeam import JimBeam
+from katbeam.aterm import KernelCache, aterm_kernel
+
+
+def test_aterm_kernel_transforms_back_to_beam():
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    support, oversample, fov = 16, 4, 4.
+    kernel = aterm_kernel(beam, 1420., 'HH', support, oversample, fov)
+    n = support * oversample
+    assert kernel.shape == (n, n) and kernel.dtype == np.complex128
+    np.testing.assert_allclose(kernel.sum() / oversample**2, beam.HH(0., 0., 1420.))
+    # The inverse transform recovers the sampled beam, padded with zeros
+    image = np.fft.fftshift(np.fft.ifft2(np.fft.ifftshift(kernel * support**2)))
+    axis = (np.arange(support) - support // 2) * (fov / support)
+    start = n // 2 - support // 2
+    inner = image[start:start + support, start:start + support]
+    np.testing.assert_allclose(inner, beam.HH_grid(axis, axis, 1420.), atol=1e-12)
+    image[start:start + support, start:start + support] = 0
+    np.testing.assert_allclose(image, 0., atol=1e-12)
+    single = aterm_kernel(JimBeam('MKAT-AA-L-JIM-2020', dtype=np.float32), 1420., 'HH',
+                          support, oversample, fov)
+    assert single.dtype == np.complex64
+    with pytest.raises(ValueError):
+        aterm_kernel(beam, 1420., 'XX')
+
+
+def test_kernel_cache_buckets_and_eviction():
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    cache = KernelCache(bucketMHz=2.)
+    kernel = cache.kernel(beam, 1420.6, 'I', support=8, oversample=4)
+    np.testing.assert_array_equal(kernel, aterm_kernel(beam, 1420., 'I', 8, 4))
+    assert not kernel.flags.writeable
+    # Frequencies in the same bucket share the kernel, other inputs do not
+    assert cache.kernel(beam, 1419.4, 'I', support=8, oversample=4) is kernel
+    assert cache.kernel(beam, 1420., 'HH', support=8, oversample=4) is not kernel
+    other = JimBeam('MKAT-AA-L-JIM-2020', dtype=np.float32)
+    assert cache.kernel(other, 1420., 'I', support=8, oversample=4) is not kernel
+    assert len(cache) == 3 and cache.nbytes == 2 * kernel.nbytes + kernel.nbytes // 2
+    # Shrinking the cache evicts the least recently used kernels
+    cache.kernel(beam, 1420., 'I', support=8, oversample=4)
+    cache.max_bytes = 2 * kernel.nbytes
+    cache.kernel(beam, 1000., 'I', support=8, oversample=4)
+    assert len(cache) == 2 and cache.nbytes == 2 * kernel.nbytes
+    assert cache.kernel(beam, 1420., 'I', support=8, oversample=4) is kernel
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0
@@ -0,0 +1,70 @@
+import errno
+import os
+
+import numpy as np
+import pytest
+
+from katbeam import JimBeam
+from katbeam.cache import BeamCache
+
+
+def test_beam_cache_hit_miss_and_eviction(tmp_path):
+    cache = BeamCache(str(tmp_path), max_bytes=10**9)
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    margin = np.linspace(-2., 2., 33)
+    grid = np.meshgrid(margin, margin, sparse=True)
+    freqs = np.linspace(900., 1600., 5)
+    cube = cache.cube(beam, freqs, grid, 'I')
+    np.testing.assert_array_equal(cube, beam.I(grid[0], grid[1], freqs))
+    assert isinstance(cube, np.memmap) and not cube.flags.writeable
+    assert len(os.listdir(str(tmp_path))) == 2
+    # Same inputs map onto the same file, while other inputs get a new one
+    assert cache.cube(beam, freqs, grid, 'I').filename == cube.filename
+    assert cache.key(beam, freqs, grid, 'HH') != cache.key(beam, freqs, grid, 'I')
+    assert cache.key(beam, freqs + 1, grid, 'I') != cache.key(beam, freqs, grid, 'I')
+    other = JimBeam('MKAT-AA-L-JIM-2020', dtype=np.float32)
+    assert cache.key(other, freqs, grid, 'I') != cache.key(beam, freqs, grid, 'I')
+    # Shrinking the cache evicts the least recently used cube
+    cache.max_bytes = cube.nbytes + 1000
+    hh = cache.cube(beam, freqs, grid, 'HH')
+    name = os.path.basename(hh.filename)
+    assert sorted(os.listdir(str(tmp_path))) == sorted([name, name[:-4] + '.hdr.npz'])
+    np.testing.assert_array_equal(cube, beam.I(grid[0], grid[1], freqs))
+    cache.clear()
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_beam_cache_counts_headers_towards_size(tmp_path):
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    margin = np.linspace(-2., 2., 64)
+    # The header of a dense grid holds both coordinate planes, each as large as the cube
+    grid = np.meshgrid(margin, margin)
+    freqs = np.array([1420.])
+    cache = BeamCache(str(tmp_path), max_bytes=10**9)
+    cube = cache.cube(beam, freqs, grid, 'I')
+    assert cube.filename == os.path.join(str(tmp_path), cache.key(beam, freqs, grid, 'I') + '.npy')
+    # Two cubes fit without their headers, but not with them
+    cache.max_bytes = 2 * os.path.getsize(cube.filename) + 1000
+    name = os.path.basename(cache.cube(beam, freqs, grid, 'HH').filename)
+    assert sorted(os.listdir(str(tmp_path))) == sorted([name, name[:-4] + '.hdr.npz'])
+    np.testing.assert_array_equal(cube, beam.I(grid[0], grid[1], freqs))
+
+
+def test_beam_cache_tolerates_concurrent_directory_creation(tmp_path, monkeypatch):
+    directory = str(tmp_path / 'cache')
+    # Simulate another process creating the directory after any existence check
+    makedirs = os.makedirs
+
+    def racing_makedirs(path):
+        makedirs(path)
+        raise OSError(errno.EEXIST, 'File exists', path)
+
+    monkeypatch.setattr(os, 'makedirs', racing_makedirs)
+    cache = BeamCache(directory)
+    assert os.path.isdir(cache.directory)
+    monkeypatch.undo()
+    # A file in the way is still an error
+    blocked = str(tmp_path / 'blocked')
+    open(blocked, 'w').close()
+    with pytest.raises(OSError):
+        BeamCache(blocked)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from katbeam import JimBeam, JimBeamArray
+from katbeam.catalogue import SourceIndex, apparent_flux
+from katbeam.jimbeam import cutoff_radius
+
+
+def test_source_index_selects_box():
+    rs = np.random.RandomState(2)
+    l, m = rs.uniform(-5., 5., (2, 1000))
+    index = SourceIndex(l, m)
+    positions = index.select(-1., 2., 0., 3.)
+    expected = np.flatnonzero((l >= -1.) & (l <= 2.) & (m >= 0.) & (m <= 3.))
+    np.testing.assert_array_equal(np.sort(index.order[positions]), expected)
+
+
+@pytest.mark.parametrize('pol', ['I', 'HH', 'VV'])
+def test_apparent_flux_matches_culled_beam(pol):
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    rs = np.random.RandomState(3)
+    l, m = rs.uniform(-8., 8., (2, 5000))
+    freqs = np.linspace(900., 1670., 5)
+    flux = rs.uniform(0., 2., (len(freqs), len(l)))
+    cutoff = cutoff_radius(0.01)
+    apparent = apparent_flux(beam, l, m, flux, freqs, cutoff, pol=pol, chunk=300)
+    expected = beam.products(l, m, freqs, which=(pol,), cutoff=cutoff)[0] * flux
+    np.testing.assert_array_equal(apparent, expected)
+    # Single channel with fixed flux
+    apparent = apparent_flux(beam, l, m, flux[0], freqs[2], cutoff, pol=pol)
+    np.testing.assert_allclose(apparent, expected[2] * flux[0] / flux[2], rtol=1e-12, atol=0)
+    with pytest.raises(ValueError):
+        apparent_flux(beam, l, m, flux, freqs, cutoff, pol='XY')
+
+
+def test_apparent_flux_of_array_beam():
+    beams = [JimBeam('MKAT-AA-L-JIM-2020'), JimBeam('MKAT-AA-L-JIM-2020')]
+    beams[1].squintlist = beams[1].squintlist + 0.5
+    array = JimBeamArray.from_beams(beams)
+    rs = np.random.RandomState(4)
+    l, m = rs.uniform(-8., 8., (2, 2000))
+    freqs = np.linspace(900., 1670., 3)
+    flux = rs.uniform(0., 2., (len(freqs), len(l)))
+    cutoff = cutoff_radius(0.01)
+    apparent = apparent_flux(array, l, m, flux, freqs, cutoff, chunk=300)
+    assert apparent.shape == (2,) + flux.shape
+    for beam, expected in zip(beams, apparent):
+        np.testing.assert_allclose(apparent_flux(beam, l, m, flux, freqs, cutoff),
+                                   expected, rtol=1e-12, atol=0)
+    apparent = apparent_flux(array, l, m, flux[0], freqs[1], cutoff)
+    np.testing.assert_allclose(apparent, [apparent_flux(beam, l, m, flux[0], freqs[1], cutoff) for beam in beams],
+                               rtol=1e-12, atol=0)
@@ -0,0 +1,89 @@
+import gc
+import os
+import sys
+
+import numpy as np
+import pytest
+
+from katbeam import JimBeam, JimBeamArray
+from katbeam.cube import generate, read_cube
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_generate_matches_products(processes):
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    margin = np.linspace(-2., 2., 65)
+    x, y = np.meshgrid(margin, margin[:33], sparse=True)
+    freqs = np.linspace(900., 1670., 13)
+    cube = generate(beam, ('I', 'HH'), freqs, (x, y), processes=processes, block=3)
+    assert cube.shape == (2, len(freqs), 33, 65)
+    I, HH = beam.products(x, y, freqs, which=('I', 'HH'))
+    np.testing.assert_array_equal(cube[0], I)
+    np.testing.assert_array_equal(cube[1], HH)
+    cube = generate('MKAT-AA-L-JIM-2020', 'VV', freqs, (x, y), processes=processes)
+    np.testing.assert_array_equal(cube, beam.VV(x, y, freqs))
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason='Needs multiprocessing.shared_memory')
+def test_generate_returns_shared_block_without_copy():
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    margin = np.linspace(-2., 2., 33)
+    x, y = np.meshgrid(margin, margin, sparse=True)
+    freqs = np.linspace(900., 1670., 4)
+    cube = generate(beam, ('I', 'HH'), freqs, (x, y), processes=2)
+    block = cube.base
+    assert not cube.flags.owndata and not block.closed
+    HH = cube[1]
+    del cube
+    gc.collect()
+    # Views keep the shared block open, which is closed once they are all gone
+    np.testing.assert_array_equal(HH, beam.HH(x, y, freqs))
+    assert not block.closed
+    del HH
+    gc.collect()
+    assert block.closed
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_quadratic_method_matches_direct(processes):
+    beam = JimBeam('MKAT-AA-UHF-JIM-2020', taper='linear')
+    rs = np.random.RandomState(5)
+    x, y = rs.uniform(-3., 3., (2, 20, 30))
+    freqs = np.linspace(550., 1050., 50)
+    cube = generate(beam, ('HH', 'VV', 'I', 'Q'), freqs, (x, y), processes=processes, method='quadratic')
+    for product, expected in zip(cube, beam.products(x, y, freqs)):
+        np.testing.assert_allclose(product, expected, rtol=0, atol=1e-12)
+    with pytest.raises(ValueError):
+        generate(beam, 'I', freqs, (x, y), method='blas')
+    with pytest.raises(TypeError):
+        generate(JimBeamArray.from_beams([beam] * 3), 'I', freqs, (x, y), processes=processes)
+
+
+def test_write_and_read_cube(tmp_path):
+    beam = JimBeam('MKAT-AA-UHF-JIM-2020', dtype=np.float32)
+    margin = np.linspace(-3., 3., 41)
+    x, y = np.meshgrid(margin, margin[:21], sparse=True)
+    freqs = np.linspace(550., 1050., 7)
+    path = str(tmp_path / 'cube.npy')
+    written = beam.write_cube(path, freqs, (x, y), pols=('HH', 'Q'), block=3)
+    del written
+    cube, header = read_cube(path)
+    assert cube.shape == (2, 7, 21, 41)
+    assert cube.dtype == np.float32
+    HH, Q = beam.products(x, y, freqs, which=('HH', 'Q'))
+    np.testing.assert_array_equal(cube[0], HH)
+    np.testing.assert_array_equal(cube[1], Q)
+    assert header['model'] == 'MKAT-AA-UHF-JIM-2020'
+    assert header['pols'] == ('HH', 'Q')
+    np.testing.assert_array_equal(header['freqMHz'], freqs)
+    np.testing.assert_array_equal(header['x'], x)
+    np.testing.assert_array_equal(header['y'], y)
+
+
+def test_generate_without_cpu_count(monkeypatch):
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    x, y = np.meshgrid(np.linspace(-2., 2., 9), np.linspace(-1., 1., 5), sparse=True)
+    freqs = np.linspace(900., 1670., 3)
+    # The number of CPUs is not always known
+    monkeypatch.setattr(os, 'cpu_count', lambda: None)
+    np.testing.assert_array_equal(generate(beam, 'I', freqs, (x, y)), beam.I(x, y, freqs))
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+import katbeam
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(code, *options):
+    return subprocess.check_output([sys.executable] + list(options) + ['-c', code],
+                                   cwd=ROOT, stderr=subprocess.STDOUT).decode()
+
+
+def test_import_is_lazy():
+    code = ("import sys, katbeam; "
+            "print(sorted(m for m in ('numpy', 'katversion', 'katbeam.jimbeam') if m in sys.modules))")
+    assert _run(code).strip() == '[]'
+
+
+def test_import_time():
+    # Regression guard: a lazy import takes a few milliseconds, while importing
+    # NumPy or probing git for the version takes tens to hundreds
+    output = _run('import katbeam', '-X', 'importtime')
+    cumulative = [int(line.split('|')[1]) for line in output.splitlines()
+                  if line.startswith('import time:') and line.split('|')[2].strip() == 'katbeam']
+    assert cumulative and cumulative[0] < 100000
+
+
+def test_lazy_attributes():
+    from katbeam.jimbeam import JimBeam
+    assert katbeam.JimBeam is JimBeam
+    assert 'JimBeam' in dir(katbeam)
+    assert katbeam.get_beam() is katbeam.get_beam()
+    assert isinstance(katbeam.__version__, str)
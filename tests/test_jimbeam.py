@@ -5,7 +5,9 @@ import matplotlib
 matplotlib.use('agg')
 import matplotlib.pylab as plt  # noqa: E402
 
-from katbeam import JimBeam  # noqa: E402
+from katbeam import JimBeam, JimBeamArray, get_beam  # noqa: E402
+from katbeam import jimbeam  # noqa: E402
+from katbeam.jimbeam import TILE_SIZE, _TaperTable, _cosine_taper_r2, cutoff_radius  # noqa: E402
 
 
 def test_unknown_model_name():
@@ -58,3 +60,455 @@ def test_UHF_beam_image():
 def test_L_beam_image():
     beam = JimBeam('MKAT-AA-L-JIM-2020')
     return showbeam(beam, 1420, 'VV', 5.)
+
+
+@pytest.mark.parametrize('pol', ['HH', 'VV', 'I'])
+def test_frequency_cube_matches_channel_loop(pol):
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    margin = np.linspace(-2., 2., 17)
+    x, y = np.meshgrid(margin, margin[:9])
+    freqs = np.linspace(850., 1700., 11)
+    pattern = getattr(beam, pol)
+    cube = pattern(x, y, freqs)
+    assert cube.shape == (len(freqs),) + x.shape
+    expected = np.array([pattern(x, y, f) for f in freqs])
+    np.testing.assert_allclose(cube, expected, rtol=1e-12)
+
+
+def test_products_match_individual_beams():
+    beam = JimBeam('MKAT-AA-UHF-JIM-2020')
+    margin = np.linspace(-3., 3., 21)
+    x, y = np.meshgrid(margin, margin)
+    freqs = np.array([600., 800., 1000.])
+    HH, VV, I, Q = beam.products(x, y, freqs)
+    np.testing.assert_allclose(HH, beam.HH(x, y, freqs))
+    np.testing.assert_allclose(VV, beam.VV(x, y, freqs))
+    np.testing.assert_allclose(I, beam.I(x, y, freqs))
+    np.testing.assert_allclose(Q, 0.5 * (HH**2 - VV**2))
+    Q, = beam.products(x, y, freqs, which=('Q',))
+    np.testing.assert_allclose(Q, 0.5 * (HH**2 - VV**2))
+    with pytest.raises(ValueError):
+        beam.products(x, y, freqs, which=('U',))
+
+
+def test_interpolated_parameters_are_cached_and_invalidated():
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    freqs = np.array([800., 900., 1234.5, 1650., 1700.])
+    params = beam._interp_params(freqs)
+    for row, lst in enumerate(np.concatenate([beam.squintlist, beam.fwhmlist])):
+        np.testing.assert_allclose(params[row], np.interp(freqs, beam.freqMHzlist, lst))
+    assert beam._interp_params(1234.5) is beam._interp_params(1234.5)
+    before = beam.HH(0.1, 0.1, 1234.5)
+    beam.squintlist = beam.squintlist + 0.01
+    assert beam.HH(0.1, 0.1, 1234.5) != before
+
+
+def test_scalar_frequency_does_not_modify_parameter_table():
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    freqs = np.linspace(900., 1670., 3)
+    expected = beam._interp_params(freqs)
+    beam._interp_params(freqs[1])
+    beam._param_cache.clear()
+    np.testing.assert_array_equal(beam._interp_params(freqs), expected)
+    np.testing.assert_array_equal(beam._interp_params(freqs[1]), expected[:, 1])
+
+
+@pytest.mark.parametrize('method,max_error', [('linear', 2e-7), ('cubic', 1e-9)])
+def test_taper_table_error_bound(method, max_error):
+    r2 = np.linspace(0., _TaperTable.r2_max + 1., 2000001)
+    # Avoid the removable singularity, where the exact formula loses accuracy
+    r2 = r2[np.abs(r2 - 0.25 / 1.1889647809329453**2) > 1e-6]
+    table = _TaperTable(method)
+    np.testing.assert_allclose(table(r2), _cosine_taper_r2(r2), rtol=0, atol=max_error)
+
+
+@pytest.mark.parametrize('taper', ['linear', 'cubic'])
+def test_tabulated_taper_beam(taper):
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    fast_beam = JimBeam('MKAT-AA-L-JIM-2020', taper=taper)
+    margin = np.linspace(-5., 5., 101)
+    x, y = np.meshgrid(margin, margin)
+    np.testing.assert_allclose(fast_beam.I(x, y, 1420.), beam.I(x, y, 1420.), rtol=0, atol=1e-6)
+    # Blanked (NaN) coordinates give NaN, like the exact taper
+    x[0, 0] = np.nan
+    blanked = fast_beam.HH(x, y, 1420.)
+    assert np.isnan(blanked[0, 0]) and np.isfinite(blanked.ravel()[1:]).all()
+    assert np.isnan(beam.HH(x, y, 1420.)[0, 0])
+    with pytest.raises(ValueError):
+        JimBeam('MKAT-AA-L-JIM-2020', taper='nearest')
+
+
+def test_evaluation_into_provided_buffers():
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    margin = np.linspace(-2., 2., 301)
+    x, y = np.meshgrid(margin, margin)
+    freqs = np.array([1000., 1400.])
+    expected = beam.I(x, y, freqs)
+    out = np.empty((2,) + x.shape)
+    scratch = np.empty(4 * TILE_SIZE)
+    assert beam.I(x, y, freqs, out=out, scratch=scratch) is out
+    np.testing.assert_allclose(out, expected)
+    HH, Q = beam.products(x, y, freqs, which=('HH', 'Q'), out=[None, out])
+    assert Q is out
+    np.testing.assert_allclose(HH, beam.HH(x, y, freqs))
+    with pytest.raises(ValueError):
+        beam.I(x, y, freqs, scratch=np.empty(10))
+    with pytest.raises(ValueError):
+        beam.I(x, y, freqs, out=np.empty(x.shape))
+    # Strided outputs work as long as the frequency axes can be flattened as a view
+    strided = np.empty((2,) + x.shape[::-1]).transpose(0, 2, 1)
+    np.testing.assert_allclose(beam.I(x, y, freqs, out=strided), expected)
+    with pytest.raises(ValueError):
+        beam.I(x, y, np.ones((2, 2)) * 1000., out=np.empty((2, 2) + x.shape).transpose(1, 0, 2, 3))
+    with pytest.raises(ValueError):
+        beam.products(x, y, freqs, which=('I', 'I'))
+
+
+def test_empty_inputs_give_empty_outputs():
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    empty = np.zeros(0)
+    assert beam.HH(empty, empty, 1420.).shape == (0,)
+    assert beam.I(empty, empty, np.array([1000., 1400.]), workers=2).shape == (2, 0)
+    assert beam.VV(np.ones((3, 4)), np.ones((3, 4)), empty).shape == (0, 3, 4)
+    assert beam.products(0., 0., empty, which=('HH', 'Q'))[1].shape == (0,)
+
+
+@pytest.mark.parametrize('taper', ['exact', 'linear', 'cubic'])
+def test_single_precision_against_double(taper):
+    beam = JimBeam('MKAT-AA-UHF-JIM-2020', taper=taper, dtype=np.float32)
+    reference = JimBeam('MKAT-AA-UHF-JIM-2020')
+    margin = np.linspace(-6., 6., 401, dtype=np.float32)
+    x, y = np.meshgrid(margin, margin)
+    freqs = np.linspace(550., 1050., 5)
+    for product, expected in zip(beam.products(x, y, freqs), reference.products(x, y, freqs)):
+        assert product.dtype == np.float32
+        np.testing.assert_allclose(product, expected, rtol=0, atol=1e-6)
+    # Double-precision coordinates are not upcast either
+    assert beam.I(x.astype(np.float64), y.astype(np.float64), 800.).dtype == np.float32
+    with pytest.raises(ValueError):
+        JimBeam('MKAT-AA-UHF-JIM-2020', dtype=np.int32)
+
+
+def test_multithreaded_evaluation():
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    margin = np.linspace(-3., 3., 513)
+    x, y = np.meshgrid(margin, margin)
+    freqs = np.array([900., 1300., 1650.])
+    expected = beam.products(x, y, freqs)
+    for actual, desired in zip(beam.products(x, y, freqs, workers=4), expected):
+        np.testing.assert_array_equal(actual, desired)
+    np.testing.assert_array_equal(beam.HH(x, y, 1300., workers=3), expected[0][1])
+    with pytest.raises(ValueError):
+        beam.I(x, y, freqs, scratch=np.empty(4 * TILE_SIZE), workers=2)
+
+
+def test_dask_cube():
+    pytest.importorskip('dask.array')
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    margin = np.linspace(-2., 2., 101)
+    x, y = np.meshgrid(margin, margin[:77], sparse=True)
+    freqs = np.linspace(900., 1600., 9)
+    cube = beam.dask_cube(x, y, freqs, 'I', chunks=(4, 32, 50))
+    assert cube.shape == (9, 77, 101)
+    assert cube.chunks == ((4, 4, 1), (32, 32, 13), (50, 50, 1))
+    np.testing.assert_array_equal(cube.compute(), beam.I(x, y, freqs))
+    np.testing.assert_array_equal(cube[2:5, 40:, :10].compute(), beam.I(x, y, freqs)[2:5, 40:, :10])
+    x, y = np.broadcast_arrays(x, y)
+    cube = beam.dask_cube(x, y, freqs, 'HH', chunks=(2, 20, 101))
+    np.testing.assert_array_equal(cube.compute(), beam.HH(x, y, freqs))
+
+
+def test_iterate_over_channel_blocks():
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    margin = np.linspace(-2., 2., 31)
+    x, y = np.meshgrid(margin, margin)
+    freqs = np.linspace(900., 1650., 10)
+    expected = beam.VV(x, y, freqs)
+    buffers = set()
+    start = 0
+    for freq_block, planes in beam.iter_channels(x, y, freqs, pol='VV', block=4):
+        assert planes.shape == (len(freq_block),) + x.shape
+        np.testing.assert_array_equal(freq_block, freqs[start:start + len(freq_block)])
+        np.testing.assert_array_equal(planes, expected[start:start + len(freq_block)])
+        buffers.add(planes.__array_interface__['data'][0])
+        start += len(freq_block)
+    assert start == len(freqs)
+    assert len(buffers) == 1
+
+
+def test_model_tables_are_parsed_once_and_shared():
+    beam1 = JimBeam('MKAT-AA-S-JIM-2020')
+    beam2 = JimBeam('MKAT-AA-S-JIM-2020')
+    assert beam1.squintlist is beam2.squintlist
+    assert beam1.freqMHzlist.shape == (35,)
+    assert beam1.fwhmlist.shape == (4, 35)
+    assert beam1.fwhmlist[0, 0] == pytest.approx(54.29 / 60.)
+    with pytest.raises(ValueError):
+        beam1.squintlist[0, 0] = 1.
+
+
+def test_shared_beams():
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(4) as executor:
+        beams = list(executor.map(get_beam, ['MKAT-AA-UHF-JIM-2020'] * 8))
+    assert all(beam is beams[0] for beam in beams)
+    assert get_beam('MKAT-AA-UHF-JIM-2020', dtype=np.float32) is not beams[0]
+    beam = beams[0]
+    assert beam.I(0.5, 0.5, 800) == JimBeam('MKAT-AA-UHF-JIM-2020').I(0.5, 0.5, 800)
+    with pytest.raises(AttributeError):
+        beam.fwhmlist = 2 * beam.fwhmlist
+    with pytest.raises(AttributeError):
+        beam.taper = 'linear'
+    with pytest.raises(ValueError):
+        beam.fwhmlist[0, 0] = 1.
+    with pytest.raises(ValueError):
+        get_beam('MKAT-AA-UHF-JIM-2012')
+
+
+def test_shared_beam_parameter_cache_under_contention(monkeypatch):
+    import sys
+    from concurrent.futures import ThreadPoolExecutor
+    monkeypatch.setattr(jimbeam, '_PARAM_CACHE_SIZE', 8)
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    freqs = np.random.RandomState(1).uniform(900., 1670., (8, 2000))
+    interval = sys.getswitchinterval()
+    # Switch threads very often to provoke interleaved cache evictions
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(lambda fs: [beam._interp_params(f) for f in fs], freqs))
+    finally:
+        sys.setswitchinterval(interval)
+    assert len(beam._param_cache) <= 8
+    for freq in freqs[0, :20]:
+        np.testing.assert_array_equal(beam._interp_params(freq), beam._interp_params(np.array([freq]))[:, 0])
+
+
+def test_array_beams_match_single_beams():
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    rs = np.random.RandomState(7)
+    squints = beam.squintlist + 0.01 * rs.randn(3, *beam.squintlist.shape)
+    fwhms = beam.fwhmlist * (1. + 0.01 * rs.randn(3, *beam.fwhmlist.shape))
+    array_beam = JimBeamArray(squints, fwhms, beam.name)
+    assert array_beam.nant == 3
+    x, y = np.meshgrid(np.linspace(-1, 1, 5), np.linspace(-1, 1, 7))
+    freqs = [1000., 1420.]
+    HH, I = array_beam.products(x, y, freqs, which=('HH', 'I'))  # noqa: E741
+    assert HH.shape == I.shape == (3, 2) + x.shape
+    offsets = x + np.arange(3)[:, np.newaxis, np.newaxis]
+    VV = array_beam.VV(offsets, y, 1420., per_antenna=True)
+    assert VV.shape == (3,) + x.shape
+    for ant in range(3):
+        beam.squintlist, beam.fwhmlist = squints[ant], fwhms[ant]
+        np.testing.assert_allclose(HH[ant], beam.HH(x, y, freqs), rtol=0, atol=1e-12)
+        np.testing.assert_allclose(I[ant], beam.I(x, y, freqs), rtol=0, atol=1e-12)
+        np.testing.assert_allclose(VV[ant], beam.VV(offsets[ant], y, 1420.), rtol=0, atol=1e-12)
+    combined = JimBeamArray.from_beams([beam, beam])
+    np.testing.assert_array_equal(combined.HH(x, y, 1420.)[1], beam.HH(x, y, 1420.))
+    with pytest.raises(ValueError):
+        JimBeamArray(squints, fwhms[:2], beam.name)
+    with pytest.raises(ValueError):
+        array_beam.I(x, y, 1420., per_antenna=True)
+
+
+def test_array_beam_channel_methods(tmp_path):
+    beams = [JimBeam('MKAT-AA-L-JIM-2020'), JimBeam('MKAT-AA-L-JIM-2020')]
+    beams[1].squintlist = beams[1].squintlist + 0.05
+    array_beam = JimBeamArray.from_beams(beams)
+    x, y = np.meshgrid(np.linspace(-1, 1, 9), np.linspace(-1, 1, 5))
+    freqs = np.array([1000., 1420.])
+    average = array_beam.band_average(x, y, freqs, 20., pol='HH')
+    assert average.shape == (2, 2) + x.shape
+    indices, values = array_beam.sparse(x, y, freqs, 1.5, pol='VV')
+    dense = np.zeros((2, 2) + x.shape)
+    dense[indices] = values
+    for ant, beam in enumerate(beams):
+        np.testing.assert_array_equal(average[ant], beam.band_average(x, y, freqs, 20., pol='HH'))
+        np.testing.assert_array_equal(dense[ant], beam.VV(x, y, freqs, cutoff=1.5))
+    freqs = np.array([1000., 1200., 1420.])
+    blocks = list(array_beam.iter_channels(x, y, freqs, pol='HH', block=2))
+    assert [planes.shape for _, planes in blocks] == [(2, 2) + x.shape, (2, 1) + x.shape]
+    np.testing.assert_array_equal(blocks[1][1], array_beam.HH(x, y, freqs[2:]))
+    with pytest.raises(TypeError):
+        array_beam.dask_cube(x, y, freqs)
+    with pytest.raises(TypeError):
+        array_beam.write_cube(str(tmp_path / 'cube.npy'), freqs, (x, y))
+
+
+def test_imaging_beam_averages_mispointed_beams():
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    x, y = np.meshgrid(np.linspace(-1, 1, 9), np.linspace(-1, 1, 5))
+    freqs = [1000., 1420.]
+    mean, var = beam.imaging_beam(x, y, freqs, 0.02, n_samples=20, seed=3, variance=True)
+    assert mean.shape == var.shape == (2,) + x.shape
+    dx, dy = np.random.RandomState(3).normal(0., 0.02, (2, 20))
+    samples = np.array([beam.I(x - dx[n], y - dy[n], freqs) for n in range(20)])
+    np.testing.assert_allclose(mean, samples.mean(axis=0), rtol=0, atol=1e-12)
+    np.testing.assert_allclose(var, samples.var(axis=0), rtol=0, atol=1e-12)
+    # Pointing errors broaden the beam, so it drops at the centre
+    assert beam.imaging_beam(0, 0, 1420., 0.05, seed=1) < beam.I(0, 0, 1420.)
+    with pytest.raises(ValueError):
+        beam.imaging_beam(x, y, 1420., 0.02, n_samples=0)
+
+
+def test_imaging_beam_variance_is_accurate_in_single_precision(monkeypatch):
+    # Evaluate the realisations in several batches
+    monkeypatch.setattr(jimbeam, '_SAMPLE_BLOCK_BYTES', 3000)
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    single = JimBeam('MKAT-AA-L-JIM-2020', dtype=np.float32)
+    x = np.array([0., 0.3, 1.])
+    dx, dy = np.random.RandomState(5).normal(0., 0.01, (2, 20000))
+    samples = beam.HH(x - dx[:, np.newaxis], -dy[:, np.newaxis], 1420.)
+    expected = samples.var(axis=0)
+    mean, var = single.imaging_beam(x, 0., 1420., 0.01, n_samples=20000, seed=5, pol='HH', variance=True)
+    assert mean.dtype == var.dtype == np.float32
+    # The variance at the beam centre is tiny compared to the beam itself
+    assert expected[0] < 1e-6
+    np.testing.assert_allclose(var, expected, rtol=1e-3)
+    # Sums over many realisations stay within the single-precision beam accuracy
+    np.testing.assert_allclose(mean, samples.mean(axis=0), rtol=0, atol=1e-6)
+    plain = single.imaging_beam(x, 0., 1420., 0.01, n_samples=20000, seed=5, pol='HH')
+    np.testing.assert_allclose(plain, samples.mean(axis=0), rtol=0, atol=1e-6)
+
+
+def test_grid_axes_match_meshgrid():
+    beam = JimBeam('MKAT-AA-UHF-JIM-2020', dtype=np.float32)
+    xaxis, yaxis = np.linspace(-2, 2, 33), np.linspace(-1, 1, 17)
+    x, y = np.meshgrid(xaxis, yaxis)
+    freqs = [600., 800.]
+    np.testing.assert_allclose(beam.HH_grid(xaxis, yaxis, freqs), beam.HH(x, y, freqs), rtol=0, atol=1e-6)
+    np.testing.assert_allclose(beam.VV_grid(xaxis, yaxis, 800.), beam.VV(x, y, 800.), rtol=0, atol=1e-6)
+    out = np.empty((2,) + x.shape, np.float32)
+    assert beam.I_grid(xaxis, yaxis, freqs, out=out) is out
+    np.testing.assert_allclose(out, beam.I(x, y, freqs), rtol=0, atol=1e-6)
+    # Tiles of a large grid share the broadcast x axis terms and slice the y axis terms
+    xaxis = np.linspace(-2, 2, TILE_SIZE // 10)
+    x, y = np.meshgrid(xaxis, yaxis)
+    np.testing.assert_allclose(beam.HH_grid(xaxis, yaxis, freqs), beam.HH(x, y, freqs), rtol=0, atol=1e-6)
+    xaxis, yaxis = np.linspace(-2, 2, 301), np.linspace(-1, 1, 257)
+    x, y = np.meshgrid(xaxis, yaxis)
+    np.testing.assert_allclose(beam.I_grid(xaxis, yaxis, freqs, workers=3), beam.I(x, y, freqs), rtol=0, atol=1e-6)
+    np.testing.assert_array_equal(beam.VV_grid(xaxis, yaxis, freqs, cutoff=1., fill=np.nan),
+                                  beam.VV(x, y, freqs, cutoff=1., fill=np.nan))
+    np.testing.assert_array_equal(beam.HH_grid(xaxis, yaxis, freqs, parangle=[30., 60.]),
+                                  beam.HH(x, y, freqs, parangle=[30., 60.]))
+    with pytest.raises(ValueError):
+        beam.HH_grid(x, y, 800.)
+
+
+def test_cutoff_radius():
+    # Half power point and first null of main lobe (at rr = 1.5)
+    assert cutoff_radius(np.sqrt(0.5)) == pytest.approx(0.5)
+    assert cutoff_radius(0.01) > 1.5 / 1.1889647809329453
+    rr = np.linspace(cutoff_radius(0.01), 20., 10000) * 1.1889647809329453
+    assert np.all(np.abs(np.cos(np.pi * rr) / (1. - 4. * rr**2)) <= 0.01)
+    with pytest.raises(ValueError):
+        cutoff_radius(1.)
+
+
+def test_cutoff_culls_beyond_radius():
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    xaxis, yaxis = np.linspace(-6, 6, 301), np.linspace(-6, 6, 201)
+    x, y = np.meshgrid(xaxis, yaxis)
+    freqs = [1000., 1420.]
+    cutoff = cutoff_radius(0.05)
+    products = beam.products(x, y, freqs, which=('HH', 'VV', 'I', 'Q'))
+    culled = beam.products(x, y, freqs, which=('HH', 'VV', 'I', 'Q'), cutoff=cutoff, fill=np.nan)
+    for full, cut in zip(products, culled):
+        kept = ~np.isnan(cut)
+        assert 0 < kept.sum() < 0.5 * kept.size
+        # Stokes beams drop the sidelobes of the feed that is beyond its cutoff
+        np.testing.assert_allclose(cut[kept], full[kept], rtol=0, atol=0.5 * 0.05**2)
+    np.testing.assert_array_equal(culled[0][~np.isnan(culled[0])], products[0][~np.isnan(culled[0])])
+    # Only the sidelobes are dropped
+    assert np.abs(products[0][np.isnan(culled[0])]).max() < 0.05
+    zeroed = beam.HH(xaxis[np.newaxis], yaxis[:, np.newaxis], freqs, cutoff=cutoff)
+    np.testing.assert_array_equal(zeroed, np.nan_to_num(culled[0]))
+    indices, values = beam.sparse(x, y, freqs, cutoff, pol='I')
+    np.testing.assert_array_equal(values, culled[2][~np.isnan(culled[2])])
+    np.testing.assert_array_equal(values, culled[2][indices])
+
+
+def test_cutoff_keeps_tiles_with_blanked_pixels():
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    x, y = np.meshgrid(np.linspace(-1, 1, 11), np.linspace(-1, 1, 11))
+    x[5, 0] = np.nan
+    expected = beam.HH(x, y, 1420.)
+    culled = beam.HH(x, y, 1420., cutoff=2.)
+    assert culled[5, 5] > 0.99
+    np.testing.assert_array_equal(culled[5, 1:], expected[5, 1:])
+    assert culled[5, 0] == 0.
+    indices, values = beam.sparse(x, y, 1420., 2., pol='HH')
+    assert len(values) == x.size - 1
+    # Fully blanked coordinates are beyond any cutoff
+    np.testing.assert_array_equal(beam.HH(np.full(3, np.nan), 0., 1420., cutoff=2., fill=-1.), -1.)
+
+
+def test_parallactic_angle_rotates_beam():
+    beam = JimBeam('MKAT-AA-UHF-JIM-2020')
+    x, y = np.meshgrid(np.linspace(-2, 2, 41), np.linspace(-1, 1, 21))
+    freqs = [600., 900.]
+    parangle = np.array([[0., 20.], [-45., 90.]])
+    HH, I = beam.products(x, y, freqs, which=('HH', 'I'), parangle=parangle)  # noqa: E741
+    assert HH.shape == I.shape == parangle.shape + (2,) + x.shape
+    for index in np.ndindex(parangle.shape):
+        angle = np.radians(parangle[index])
+        # Sky coordinates in antenna frame
+        ax, ay = np.cos(angle) * x + np.sin(angle) * y, np.cos(angle) * y - np.sin(angle) * x
+        np.testing.assert_allclose(HH[index], beam.HH(ax, ay, freqs), rtol=0, atol=1e-12)
+        np.testing.assert_allclose(I[index], beam.I(ax, ay, freqs), rtol=0, atol=1e-12)
+    # A quarter turn swaps the axes of the beam
+    np.testing.assert_allclose(beam.VV(x, y, 900., parangle=90.), beam.VV(y, -x, 900.), rtol=0, atol=1e-12)
+    # Separable grids and culled tiles give the same rotated beam
+    xaxis, yaxis = np.linspace(-10, 10, 401), np.linspace(-10, 10, 301)
+    culled = beam.HH(xaxis[np.newaxis], yaxis[:, np.newaxis], freqs, parangle=30., cutoff=2.)
+    x, y = np.meshgrid(xaxis, yaxis)
+    rotated = beam.HH(x, y, freqs, parangle=30.)
+    kept = culled != 0
+    assert 0 < kept.sum() < 0.5 * kept.size
+    np.testing.assert_allclose(culled[kept], rotated[kept], rtol=0, atol=1e-12)
+
+
+def test_jones_matrices():
+    beam = JimBeam('MKAT-AA-L-JIM-2020', dtype=np.float32)
+    rs = np.random.RandomState(11)
+    l, m = rs.uniform(-1, 1, (2, 30))
+    freqs = [1000., 1200., 1420.]
+    jones = beam.jones(l, m, freqs)
+    assert jones.shape == (3, 30, 2, 2)
+    assert jones.dtype == np.complex64
+    HH, VV = beam.products(l, m, freqs, which=('HH', 'VV'))
+    np.testing.assert_array_equal(jones[..., 0, 0], HH)
+    np.testing.assert_array_equal(jones[..., 1, 1], VV)
+    assert not jones[..., 0, 1].any() and not jones[..., 1, 0].any() and not jones.imag.any()
+    # Time, antenna, channel, direction layout written into caller's array
+    array_beam = JimBeamArray.from_beams([JimBeam('MKAT-AA-L-JIM-2020')] * 2)
+    parangle = [-10., 0., 25., 40.]
+    out = np.ones((4, 2, 3, 30, 2, 2), np.complex128)
+    assert array_beam.jones(l, m, freqs, out=out, parangle=parangle) is out
+    HH, VV = array_beam.products(l, m, freqs, which=('HH', 'VV'), parangle=parangle)
+    np.testing.assert_array_equal(out[..., 0, 0], HH.transpose(1, 0, 2, 3))
+    np.testing.assert_array_equal(out[..., 1, 1], VV.transpose(1, 0, 2, 3))
+    assert not out[..., 0, 1].any() and not out.imag.any()
+    with pytest.raises(ValueError):
+        beam.jones(l, m, freqs, out=np.empty((3, 30, 2, 2)))
+
+
+def test_band_averaged_beam():
+    beam = JimBeam('MKAT-AA-L-JIM-2020')
+    x, y = np.meshgrid(np.linspace(-2, 2, 21), np.linspace(-1, 1, 11))
+    freqs, widths = np.array([950., 1200., 1420.]), np.array([20., 40., 80.])
+    average = beam.band_average(x, y, freqs, widths, pol='HH', nodes=6)
+    assert average.shape == (3,) + x.shape
+    offsets, weights = np.polynomial.legendre.leggauss(6)
+    expected = sum(0.5 * w * beam.HH(x, y, freqs + 0.5 * t * widths) for t, w in zip(offsets, weights))
+    np.testing.assert_allclose(average, expected, rtol=0, atol=1e-14)
+    # Compare against a dense average across the channels
+    dense = np.mean([beam.I(x, y, freqs + u * widths) for u in np.linspace(-0.5, 0.5, 401)], axis=0)
+    np.testing.assert_allclose(beam.band_average(x, y, freqs, widths), dense, rtol=0, atol=2e-4)
+    # Narrow channels sample the beam at their centres
+    np.testing.assert_allclose(beam.band_average(x, y, 1420., 1e-6), beam.I(x, y, 1420.), rtol=0, atol=1e-12)
+    # A flat channel response gives the same result as none
+    out = np.empty((3,) + x.shape)
+    assert beam.band_average(x, y, freqs, widths, out=out, response=np.ones_like) is out
+    np.testing.assert_allclose(out, beam.band_average(x, y, freqs, widths), rtol=1e-14, atol=0)